@@ -0,0 +1,384 @@
+"""Benchmarks the data paths behind the app's screens against a local DynamoDB stand-in, without the GUI.
+
+    python benchmark.py                                   # moto, 100 and 1000 items per table
+    python benchmark.py --sizes 100 1000 10000 100000 --iterations 50
+    python benchmark.py --endpoint-url http://localhost:8000   # DynamoDB Local instead of moto
+    python benchmark.py --baseline benchmark_baseline.json     # exits with 1 on a regression
+    python benchmark.py --save-baseline benchmark_baseline.json
+
+Startup is measured first: a fresh interpreter imports main and then builds the DynamoDB
+resource, --startup-runs times. Importing main must not load boto3, botocore's session,
+requests or numpy: the first three belong to prewarm_dynamodb(), after the login screen is
+showing, and numpy to the first time the dashboard ranks riders.
+
+For every table size, GovernmentEmployees and Drivers are seeded with that many items and each
+flow is run --iterations times with an empty item cache, so every run pays its DynamoDB reads.
+show_drivers_list reads the first page of a new roster pass; show_drivers_list_shared lists the
+drivers right after another session did, as on a busy server.
+Each flow reports latency percentiles, DynamoDB calls per run by operation, and the items,
+response bytes and capacity units it used. Setup and cleanup around a run (the request an accept needs, say) are
+not counted.
+
+Call, item, byte and capacity counts do not depend on the machine and are compared strictly; latencies
+are compared against the baseline with --latency-tolerance, so a baseline is only meaningful for
+latency on the machine that saved it.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+# The local mirror of the app goes to a throwaway directory, never to the working copy's sts_local.db
+os.environ.setdefault("FLET_APP_STORAGE_DATA", tempfile.mkdtemp(prefix="sts-benchmark-"))
+
+STAND_IN_REGION = "us-east-1"
+PASSWORD = "benchmark"
+CENTER = (-19.92, -43.94)
+# Modules whose loading belongs after the first screen, not to importing main
+DEFERRED_MODULES = ('boto3', 'botocore.session', 'requests', 'numpy')
+
+STARTUP_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+loaded = [name for name in {DEFERRED_MODULES!r} if name in sys.modules]
+main.dynamodb.configure(region_name={STAND_IN_REGION!r}, aws_access_key_id="benchmark", aws_secret_access_key="benchmark")
+for table in (main.gov_employees_table, main.drivers_table, main.rides_table):
+    table.meta
+connected = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - started) * 1000, 'dynamodb_ms': (connected - imported) * 1000, 'loaded': loaded}}))
+"""
+
+FLOWS = ('login_employee', 'show_drivers_list', 'show_drivers_list_shared', 'show_nearest_drivers', 'send_ride_request',
+         'accept_ride_request', 'cancel_ride_request', 'share_location')
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def map_link(item_id):
+    """A full Google Maps link spread deterministically around the city centre."""
+    latitude = CENTER[0] + (item_id * 7919 % 1000 - 500) / 5000
+    longitude = CENTER[1] + (item_id * 104729 % 1000 - 500) / 5000
+    return f"https://www.google.com/maps/@{latitude:.6f},{longitude:.6f},15z"
+
+class CallMeter:
+    """Counts the DynamoDB calls made through some clients, with the items, response bytes and capacity units they used."""
+
+    def __init__(self, clients, capacity_units):
+        self.capacity_units = capacity_units
+        self._lock = threading.Lock()
+        self.reset()
+        for client in clients:
+            client.meta.events.register('after-call.dynamodb', self._after_call)
+
+    def reset(self):
+        with self._lock:
+            self.calls = Counter()
+            self.items = 0
+            self.bytes = 0
+            self.capacity = 0.0
+
+    def _after_call(self, http_response, parsed, model, **kwargs):
+        if 'Items' in parsed:
+            items = len(parsed['Items'])
+        elif 'Responses' in parsed:
+            items = sum(len(table_items) for table_items in parsed['Responses'].values())
+        else:
+            items = int(bool(parsed.get('Item') or parsed.get('Attributes')))
+        with self._lock:
+            self.calls[model.name] += 1
+            self.items += items
+            self.bytes += len(http_response.content or b"")
+            self.capacity += self.capacity_units(parsed)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.calls), self.items, self.bytes, self.capacity
+
+def measure_startup(runs):
+    """Imports main in fresh interpreters; returns import and DynamoDB setup percentiles and any module loaded too early."""
+    import_times = []
+    dynamodb_times = []
+    loaded = set()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        import_times.append(probe['import_ms'])
+        dynamodb_times.append(probe['dynamodb_ms'])
+        loaded.update(probe['loaded'])
+    import_times.sort()
+    dynamodb_times.sort()
+    return {
+        'import_p50_ms': round(percentile(import_times, 0.5), 3),
+        'import_max_ms': round(import_times[-1], 3),
+        'dynamodb_p50_ms': round(percentile(dynamodb_times, 0.5), 3),
+        'loaded_at_import': sorted(loaded),
+    }
+
+def connect(main, endpoint_url=None):
+    """Points the app's DynamoDB resource and low-level client, and so its tables, at the stand-in."""
+    main.dynamodb.configure(
+        region_name=STAND_IN_REGION,
+        endpoint_url=endpoint_url,
+        aws_access_key_id="benchmark",
+        aws_secret_access_key="benchmark"
+    )
+    return CallMeter((main.dynamodb.meta.client, main.dynamodb.client), main.consumed_capacity_units)
+
+def create_tables(main):
+    """(Re)creates the three tables the app uses, empty."""
+    client = main.dynamodb.meta.client
+    for table_name in ('GovernmentEmployees', 'Drivers', 'Rides'):
+        try:
+            client.delete_table(TableName=table_name)
+            client.get_waiter('table_not_exists').wait(TableName=table_name)
+        except client.exceptions.ResourceNotFoundException:
+            pass
+    for table_name in ('GovernmentEmployees', 'Drivers'):
+        client.create_table(
+            TableName=table_name,
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'N'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+    client.create_table(
+        TableName='Rides',
+        KeySchema=[{'AttributeName': 'DriverID', 'KeyType': 'HASH'}, {'AttributeName': 'RideKey', 'KeyType': 'RANGE'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'DriverID', 'AttributeType': 'N'},
+            {'AttributeName': 'RideKey', 'AttributeType': 'S'},
+            {'AttributeName': 'EmployeeID', 'AttributeType': 'N'}
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': main.RIDES_BY_EMPLOYEE,
+            'KeySchema': [{'AttributeName': 'EmployeeID', 'KeyType': 'HASH'}, {'AttributeName': 'DriverID', 'KeyType': 'RANGE'}],
+            'Projection': {'ProjectionType': 'ALL'}
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    for table_name in ('GovernmentEmployees', 'Drivers', 'Rides'):
+        client.get_waiter('table_exists').wait(TableName=table_name)
+
+def seed_tables(main, size):
+    updated_at = main.now_ms()
+    with main.gov_employees_table.batch_writer() as batch:
+        for item_id in range(1, size + 1):
+            batch.put_item(Item={
+                'ID': item_id, 'Name': f"Servidor {item_id}", 'Password': PASSWORD, 'Role': "Fiscal",
+                'Contact': f"31 9{item_id:08d}", 'MapLocation': map_link(item_id), 'AdditionalDetails': "",
+                'UpdatedAt': updated_at
+            })
+    with main.drivers_table.batch_writer() as batch:
+        for item_id in range(1, size + 1):
+            batch.put_item(Item={
+                'ID': item_id, 'Name': f"Motorista {item_id}", 'Password': PASSWORD, 'Status': "Disponível",
+                'Contact': f"31 8{item_id:08d}", 'MapLocation': map_link(size + item_id), 'AdditionalDetails': "",
+                'PassengerCount': 0, 'Seats': main.DEFAULT_SEATS, 'Version': 0, 'UpdatedAt': updated_at
+            })
+
+def flows(main, size):
+    """Maps each flow to (setup, run, cleanup) callables taking the iteration number; only run is measured.
+
+    Every run mirrors what the screen's handler sends to DynamoDB, and iteration i works with
+    employee and driver i, so runs never pile rides onto the same driver.
+    """
+    def employee_id(i):
+        return i % size + 1
+
+    def driver_id(i):
+        return (i * 7 + 3) % size + 1
+
+    def request_ride(i):
+        main.transition_ride('request', driver_id(i), employee_id(i), f"Servidor {employee_id(i)}")
+
+    def cancel_ride(i):
+        main.transition_ride('cancel', driver_id(i), employee_id(i))
+
+    def login_employee(i):
+        return main.check_credentials('GovernmentEmployees', employee_id(i), PASSWORD)
+
+    def start_drivers_pass(i):
+        # No session has listed the drivers within the roster's max age: the first page is read cold
+        main.rosters['Drivers'].current(max_age=0)
+
+    def list_drivers_elsewhere(i):
+        # Another session listed the drivers moments ago, so its first page is shared
+        start_drivers_pass(i)
+        main.RosterPager(main.rosters['Drivers'], main.RosterOverlay()).next_page()
+
+    def show_drivers_list(i):
+        main.get_employee_rides(employee_id(i))
+        drivers_page = main.RosterPager(main.rosters['Drivers'], main.RosterOverlay()).next_page()
+        main.NameIndex().add_items(drivers_page)
+
+    def show_nearest_drivers(i):
+        # The whole-roster location index the list screen loads in the background, read cold
+        origin = main.parse_coordinates(map_link(employee_id(i)))
+        main.driver_locations.load(max_age=0).nearest(origin)
+
+    def accept_ride_request(i):
+        main.transition_ride('accept', driver_id(i), employee_id(i), f"Servidor {employee_id(i)}")
+
+    def remove_passenger(i):
+        main.transition_ride('remove', driver_id(i), employee_id(i))
+
+    def cancel_ride_request(i):
+        for ride in main.get_employee_rides(employee_id(i)):
+            if ride['State'] == 'RideRequests':
+                main.transition_ride('cancel', ride['DriverID'], employee_id(i))
+
+    def cache_shared_link(i):
+        # Link expansion is served from its cache, so the benchmark never touches the network
+        link = map_link(employee_id(i) + 1)
+        main.map_link_cache.put('MapLinks', link, {'URL': link, 'Coordinates': main.parse_coordinates(link)})
+
+    def share_location(i):
+        full_url = main.expand_url(map_link(employee_id(i) + 1))
+        main.update_employee_data(employee_id(i), "SET MapLocation = :loc", {":loc": full_url})
+
+    return {
+        'login_employee': (None, login_employee, None),
+        'show_drivers_list': (start_drivers_pass, show_drivers_list, None),
+        'show_drivers_list_shared': (list_drivers_elsewhere, show_drivers_list, None),
+        'show_nearest_drivers': (None, show_nearest_drivers, None),
+        'send_ride_request': (None, request_ride, cancel_ride),
+        'accept_ride_request': (request_ride, accept_ride_request, remove_passenger),
+        'cancel_ride_request': (request_ride, cancel_ride_request, None),
+        'share_location': (cache_shared_link, share_location, None),
+    }
+
+def run_flow(main, meter, setup, run, cleanup, iterations):
+    latencies = []
+    calls = Counter()
+    items = 0
+    response_bytes = 0
+    capacity = 0.0
+    for i in range(iterations):
+        if setup:
+            setup(i)
+        main.item_cache.clear()
+        meter.reset()
+        started = time.perf_counter()
+        run(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+        run_calls, run_items, run_bytes, run_capacity = meter.snapshot()
+        calls.update(run_calls)
+        items += run_items
+        response_bytes += run_bytes
+        capacity += run_capacity
+        if cleanup:
+            cleanup(i)
+    latencies.sort()
+    return {
+        'p50_ms': round(percentile(latencies, 0.5), 3),
+        'p90_ms': round(percentile(latencies, 0.9), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'calls': {operation: round(count / iterations, 2) for operation, count in sorted(calls.items())},
+        'items': round(items / iterations, 2),
+        'bytes': round(response_bytes / iterations, 1),
+        'capacity_units': round(capacity / iterations, 2),
+    }
+
+def run_benchmark(main, meter, sizes, iterations, selected_flows):
+    results = {}
+    for size in sizes:
+        create_tables(main)
+        started = time.perf_counter()
+        seed_tables(main, size)
+        print(f"\n{size} items per table (seeded in {time.perf_counter() - started:.1f} s)")
+        print(f"{'flow':<22}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'calls':>7}{'items':>9}{'bytes':>10}{'units':>8}")
+        results[str(size)] = {}
+        for flow_name, (setup, run, cleanup) in flows(main, size).items():
+            if flow_name not in selected_flows:
+                continue
+            result = run_flow(main, meter, setup, run, cleanup, iterations)
+            results[str(size)][flow_name] = result
+            print(f"{flow_name:<22}{result['p50_ms']:>9.2f}{result['p90_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                  f"{sum(result['calls'].values()):>7g}{result['items']:>9g}{result['bytes']:>10g}{result['capacity_units']:>8g}")
+    return results
+
+def compare(results, baseline, latency_tolerance, volume_tolerance):
+    """Returns a line per measurement that got worse than the baseline."""
+    regressions = []
+    startup = results.get('startup')
+    if startup:
+        if startup['loaded_at_import']:
+            regressions.append(f"startup: importing main loads {', '.join(startup['loaded_at_import'])}")
+        base = baseline.get('startup')
+        if base and startup['import_p50_ms'] > base['import_p50_ms'] * (1 + latency_tolerance):
+            regressions.append(f"startup: import p50 {startup['import_p50_ms']:.1f} ms (baseline {base['import_p50_ms']:.1f} ms)")
+    for size, size_results in results['flows'].items():
+        for flow_name, result in size_results.items():
+            base = baseline.get('flows', {}).get(size, {}).get(flow_name)
+            if base is None:
+                continue
+            where = f"{flow_name} @ {size}"
+            if result['p50_ms'] > base['p50_ms'] * (1 + latency_tolerance):
+                regressions.append(f"{where}: p50 {result['p50_ms']:.2f} ms (baseline {base['p50_ms']:.2f} ms)")
+            for operation, count in result['calls'].items():
+                if count > base['calls'].get(operation, 0):
+                    regressions.append(f"{where}: {count:g} {operation} calls (baseline {base['calls'].get(operation, 0):g})")
+            for measure in ('items', 'bytes', 'capacity_units'):
+                if measure in base and result[measure] > base[measure] * (1 + volume_tolerance):
+                    regressions.append(f"{where}: {result[measure]:g} {measure} read (baseline {base[measure]:g})")
+    return regressions
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks the app's DynamoDB data paths against a local stand-in.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000], help="items per table, one run per size")
+    parser.add_argument('--iterations', type=int, default=20, help="measured runs per flow")
+    parser.add_argument('--flows', nargs='+', choices=FLOWS, default=list(FLOWS))
+    parser.add_argument('--startup-runs', type=int, default=5, help="fresh interpreters timed importing main, 0 to skip")
+    parser.add_argument('--endpoint-url', help="DynamoDB Local endpoint; moto is used when omitted")
+    parser.add_argument('--baseline', help="JSON file of a previous run to compare against")
+    parser.add_argument('--save-baseline', help="writes this run's results to the given JSON file")
+    parser.add_argument('--latency-tolerance', type=float, default=0.5, help="allowed p50 slowdown, 0.5 = 50%%")
+    parser.add_argument('--volume-tolerance', type=float, default=0.1, help="allowed growth of items and bytes read")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.endpoint_url is None:
+        from moto import mock_aws
+        mock_aws().start()
+    import main as app
+
+    results = {}
+    if args.startup_runs > 0:
+        results['startup'] = startup = measure_startup(args.startup_runs)
+        print(f"startup: import main p50 {startup['import_p50_ms']:.1f} ms (max {startup['import_max_ms']:.1f} ms), "
+              f"DynamoDB setup p50 {startup['dynamodb_p50_ms']:.1f} ms, "
+              f"loaded at import: {', '.join(startup['loaded_at_import']) or 'none'}")
+    meter = connect(app, args.endpoint_url)
+    results['flows'] = run_benchmark(app, meter, args.sizes, args.iterations, set(args.flows))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.latency_tolerance, args.volume_tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
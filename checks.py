@@ -0,0 +1,174 @@
+"""Checks the app's data helpers against a local DynamoDB stand-in, without the GUI.
+
+    python checks.py                                      # moto
+    python checks.py --endpoint-url http://localhost:8000   # DynamoDB Local instead of moto
+
+Covers the change watcher (backoff while nothing changes, change detection and the reported
+diff), the low-level item decoding behind the roster rows, and the local copy of update
+expressions used while offline, compared with what DynamoDB itself does. Prints one line per
+check and exits with 1 if any fails.
+"""
+import argparse
+import sys
+import threading
+import time
+from decimal import Decimal
+
+from benchmark import connect, create_tables
+
+DRIVER = {'ID': 1, 'Name': "Motorista 1", 'Status': "Disponível", 'MapLocation': "https://www.google.com/maps/@-19.9,-43.9,15z",
+          'Contact': "31 90000-0001", 'Version': 1, 'UpdatedAt': 1000}
+
+def put_driver(main, **changes):
+    item = dict(DRIVER, **changes)
+    main.drivers_table.put_item(Item=item)
+    return main.drivers_table.get_item(Key={'ID': item['ID']})['Item']
+
+def check_watcher_backoff(main):
+    shown = put_driver(main)
+    watcher = main.ItemWatcher(main.drivers_table, 1, lambda item, changes: None, min_interval=1, max_interval=4)
+    watcher.observe(shown)
+    intervals = []
+    for _ in range(3):
+        assert watcher.poll_once() == {}, "an unchanged item was reported"
+        intervals.append(watcher.interval)
+    assert intervals == [2, 4, 4], f"intervals while unchanged were {intervals}, expected [2, 4, 4]"
+    watcher.observe(shown)
+    assert watcher.interval == 1, "observe() did not reset the interval"
+
+def check_watcher_diff(main):
+    shown = put_driver(main)
+    reported = []
+    watcher = main.ItemWatcher(main.drivers_table, 1, lambda item, changes: reported.append((item, changes)), min_interval=1, max_interval=4)
+    watcher.observe(shown)
+    watcher.poll_once()
+    main.drivers_table.update_item(
+        Key={'ID': 1}, UpdateExpression="SET #status = :s, UpdatedAt = :u REMOVE MapLocation",
+        ExpressionAttributeNames={'#status': 'Status'}, ExpressionAttributeValues={':s': "Ausente", ':u': 2000}
+    )
+    changes = watcher.poll_once()
+    assert changes == {'Status': "Ausente", 'UpdatedAt': 2000, 'MapLocation': None}, f"reported diff was {changes}"
+    assert len(reported) == 1 and reported[0][1] == changes and reported[0][0]['Status'] == "Ausente", "on_change was not called once with the new item"
+    assert watcher.interval == 1, "a change did not reset the interval"
+    assert watcher.poll_once() == {} and len(reported) == 1, "the same change was reported twice"
+
+def check_watcher_thread(main):
+    shown = put_driver(main)
+    changed = threading.Event()
+    watcher = main.ItemWatcher(main.drivers_table, 1, lambda item, changes: changed.set(), min_interval=0.05, max_interval=0.2)
+    watcher.observe(shown)
+    watcher.start()
+    try:
+        put_driver(main, Status="Dirigindo", UpdatedAt=3000)
+        assert changed.wait(5), "the running watcher did not report a change within 5 s"
+    finally:
+        watcher.stop()
+
+def check_watcher_observe(main):
+    """observe() re-times the next poll; it must not read an item the screen has just read."""
+    shown = put_driver(main)
+    polls = []
+
+    class CountingTable:
+        name = 'Drivers'
+
+        def get_item(self, **kwargs):
+            polls.append(kwargs)
+            return main.drivers_table.get_item(**kwargs)
+
+    watcher = main.ItemWatcher(CountingTable(), 1, lambda item, changes: None, min_interval=0.5, max_interval=2)
+    watcher.observe(shown)
+    watcher.start()
+    try:
+        for _ in range(3):
+            time.sleep(0.1)
+            watcher.observe(shown)
+        assert not polls, f"{len(polls)} polls within min_interval of observe()"
+        time.sleep(0.7)
+        assert len(polls) == 1, f"{len(polls)} polls one min_interval after the last observe(), expected 1"
+    finally:
+        watcher.stop()
+
+def check_decode_attribute(main):
+    cases = [
+        ({'S': "a"}, "a"), ({'N': "42"}, 42), ({'N': "-7"}, -7), ({'N': "2.5"}, Decimal("2.5")), ({'N': "1E+2"}, Decimal("1E+2")),
+        ({'BOOL': False}, False), ({'NULL': True}, None), ({'SS': ["a", "b"]}, frozenset({"a", "b"})),
+        ({'NS': ["1", "0.5"]}, frozenset({1, Decimal("0.5")})), ({'L': [{'S': "x"}, {'N': "1"}]}, ("x", 1)),
+        ({'M': {'k': {'N': "3"}}}, main.MappingProxyType({'k': 3})),
+    ]
+    for raw, expected in cases:
+        decoded = main.decode_attribute(raw)
+        assert decoded == expected and type(decoded) is type(expected), f"{raw} decoded to {decoded!r}, expected {expected!r}"
+
+def check_roster_rows(main):
+    put_driver(main)
+    raw = main.dynamodb.client.get_item(TableName='Drivers', Key={'ID': {'N': "1"}})['Item']
+    row = main.DriverRow.from_raw(raw)
+    item_row = main.DriverRow.from_item(main.drivers_table.get_item(Key={'ID': 1})['Item'])
+    expected = {attribute: DRIVER[attribute] for attribute in main.LIST_ATTRIBUTES['Drivers']}
+    assert dict(row) == expected, f"row from the low-level item was {dict(row)}"
+    assert dict(item_row) == expected, f"row from the resource item was {dict(item_row)}"
+    assert type(row['ID']) is int and type(item_row['ID']) is int, "row IDs must be int"
+    assert row.label == "Motorista 1 - Status: Disponível" and row.available, "label or availability not precomputed"
+    assert 'Contact' not in row and row.get('Contact') is None, "attributes outside the list leaked into the row"
+    try:
+        row.Status = "Ausente"
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("rows must be read-only")
+    partial = main.EmployeeRow.from_raw({'ID': {'N': "9"}})
+    assert dict(partial) == {'ID': 9} and len(partial) == 1, "a missing attribute must be absent from the row"
+
+def check_update_expression(main):
+    """The offline copy of an update must leave the item as DynamoDB would."""
+    cases = [
+        ("SET #status = :s, MapLocation = :m", {':s': "Ausente", ':m': "link"}, {'#status': 'Status'}),
+        ("REMOVE MapLocation, Contact", {}, None),
+        ("ADD Version :one, Tags :tags", {':one': 1, ':tags': {"b", "c"}}, None),
+        ("DELETE Tags :tags", {':tags': {"a"}}, None),
+        ("DELETE Tags :tags", {':tags': {"a", "z"}}, None),
+        ("SET Seats = :seats REMOVE Contact ADD Version :one", {':seats': 3, ':one': 1}, None),
+    ]
+    for update_expression, values, names in cases:
+        original = put_driver(main, Tags={"a", "z"})
+        local = main.apply_update_expression(original, update_expression, values, names)
+        params = {'Key': {'ID': 1}, 'UpdateExpression': update_expression, 'ReturnValues': 'ALL_NEW'}
+        if values:
+            params['ExpressionAttributeValues'] = values
+        if names:
+            params['ExpressionAttributeNames'] = names
+        server = main.drivers_table.update_item(**params)['Attributes']
+        assert local == server, f"{update_expression}: local copy {local} differs from DynamoDB's {server}"
+        assert original.get('Tags') == {"a", "z"}, f"{update_expression}: the original item was modified"
+
+CHECKS = (check_watcher_backoff, check_watcher_diff, check_watcher_thread, check_watcher_observe, check_decode_attribute,
+          check_roster_rows, check_update_expression)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Checks the app's data helpers against a local DynamoDB stand-in.")
+    parser.add_argument('--endpoint-url', help="DynamoDB Local endpoint; moto is used when omitted")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.endpoint_url is None:
+        from moto import mock_aws
+        mock_aws().start()
+    import main as app
+
+    connect(app, args.endpoint_url)
+    create_tables(app)
+    failures = 0
+    for check in CHECKS:
+        try:
+            check(app)
+        except AssertionError as e:
+            failures += 1
+            print(f"FAIL {check.__name__}: {e}")
+        else:
+            print(f"ok   {check.__name__}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,89 +1,2148 @@
-import boto3
 import flet as ft
-from botocore.exceptions import ClientError
-import requests
+from botocore.exceptions import ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
+import bisect
+import contextvars
+import enum
+import functools
+import hashlib
+import hmac
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+import sqlite3
+import sys
+import weakref
+from collections import OrderedDict, deque, namedtuple
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from decimal import Decimal
+from types import MappingProxyType
 
 # AWS Keys
 AWS_ACCESS_KEY_ID = "insert-access-key"
 AWS_SECRET_ACCESS_KEY = "insert-secret-access-key"
 AWS_REGION = "insert-aws-dynamodb-region" 
 
+# DynamoDB client tuning: a connection pool big enough for the I/O pool plus parallel scans and batch reads,
+# bounded timeouts, and adaptive retries, which back off on throttling and, once DynamoDB starts throttling,
+# rate-limit this client with a token bucket. Writes still throttled after the last attempt are queued.
+DYNAMODB_MAX_POOL_CONNECTIONS = 16
+DYNAMODB_CONNECT_TIMEOUT = 3.05
+DYNAMODB_READ_TIMEOUT = 10
+DYNAMODB_MAX_RETRIES = 6
+
+class LazyDynamoDB:
+    """The boto3 DynamoDB resource, and a low-level client, built on first use rather than at import."""
+
+    def __init__(self, **resource_kwargs):
+        self._resource_kwargs = resource_kwargs
+        self._resource = None
+        self._client = None
+        self._lock = threading.Lock()
+
+    def configure(self, **resource_kwargs):
+        with self._lock:
+            self._resource_kwargs = resource_kwargs
+            self._resource = None
+            self._client = None
+
+    @staticmethod
+    def _config():
+        from botocore.config import Config
+
+        return Config(
+            max_pool_connections=DYNAMODB_MAX_POOL_CONNECTIONS,
+            connect_timeout=DYNAMODB_CONNECT_TIMEOUT,
+            read_timeout=DYNAMODB_READ_TIMEOUT,
+            retries={'mode': 'adaptive', 'max_attempts': DYNAMODB_MAX_RETRIES},
+            tcp_keepalive=True
+        )
+
+    @property
+    def resource(self):
+        resource = self._resource
+        if resource is None:
+            with self._lock:
+                if self._resource is None:
+                    import boto3
+
+                    self._resource = boto3.resource('dynamodb', config=self._config(), **self._resource_kwargs)
+                    instrument_dynamodb(self._resource.meta.client)
+                resource = self._resource
+        return resource
+
+    @property
+    def client(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+
+                    self._client = boto3.client('dynamodb', config=self._config(), **self._resource_kwargs)
+                    instrument_dynamodb(self._client)
+                client = self._client
+        return client
+
+    def __getattr__(self, name):
+        return getattr(self.resource, name)
+
+class LazyTable:
+    """A DynamoDB Table of a LazyDynamoDB; its name is known up front, everything else waits for the resource."""
+
+    def __init__(self, connection, name):
+        self.name = name
+        self._connection = connection
+        self._table = None
+        self._resource = None
+
+    def __getattr__(self, attribute):
+        resource = self._connection.resource
+        if self._resource is not resource:
+            self._table = resource.Table(self.name)
+            self._resource = resource
+        return getattr(self._table, attribute)
+
 # DynamoDB Initialization
-dynamodb = boto3.resource(
-    'dynamodb',
+dynamodb = LazyDynamoDB(
     region_name=AWS_REGION,
     aws_access_key_id=AWS_ACCESS_KEY_ID,
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY
 )
 
-gov_employees_table = dynamodb.Table('GovernmentEmployees')
-drivers_table = dynamodb.Table('Drivers')
+gov_employees_table = LazyTable(dynamodb, 'GovernmentEmployees')
+drivers_table = LazyTable(dynamodb, 'Drivers')
+
+# One item per ride request or passenger, so both drivers and employees find their rides with a query.
+# Key: DriverID (partition) + RideKey (sort) = "<State>#<EmployeeID>", State being 'RideRequests' or 'Passengers'.
+# The EmployeeRides index (EmployeeID partition, DriverID sort) lists the rides of an employee.
+rides_table = LazyTable(dynamodb, 'Rides')
+RIDES_BY_EMPLOYEE = 'EmployeeRides'
+RIDE_STATES = ('RideRequests', 'Passengers')
+
+tables = {'GovernmentEmployees': gov_employees_table, 'Drivers': drivers_table}
+
+# Attributes read for detail screens and for list rows. Password is only ever read by check_credentials.
+ITEM_ATTRIBUTES = {
+    'GovernmentEmployees': ('ID', 'Name', 'Role', 'Contact', 'MapLocation', 'AdditionalDetails', 'UpdatedAt'),
+    'Drivers': ('ID', 'Name', 'Status', 'Contact', 'MapLocation', 'AdditionalDetails', 'PassengerCount', 'Seats',
+                'Version', 'UpdatedAt'),
+}
+LIST_ATTRIBUTES = {
+    'GovernmentEmployees': ('ID', 'Name'),
+    'Drivers': ('ID', 'Name', 'Status', 'MapLocation'),
+}
+
+# Passenger seats of a driver whose item has no Seats attribute
+DEFAULT_SEATS = 4
+
+# Errors raised by botocore when DynamoDB cannot be reached at all
+OFFLINE_ERRORS = (BotoConnectionError, HTTPClientError)
+
+# Error codes of a throttled request, and the cancellation reasons of a transaction refused for load rather
+# than for its conditions. Writes that still fail with them are queued like offline ones and replayed
+# every THROTTLED_REPLAY_INTERVAL seconds until they go through.
+THROTTLING_ERRORS = {'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded'}
+THROTTLED_CANCELLATIONS = {'ThrottlingError', 'ProvisionedThroughputExceeded', 'TransactionConflict'}
+THROTTLED_REPLAY_INTERVAL = 5
+
+# Local SQLite mirror: one file per device holding the items read on it (signed-in accounts, opened items),
+# re-read by key in the background every LOCAL_SYNC_INTERVAL seconds.
+LOCAL_STORE_PATH = os.path.join(os.getenv("FLET_APP_STORAGE_DATA", "."), "sts_local.db")
+LOCAL_SYNC_INTERVAL = 30
+
+# Change watcher: the poll interval starts at WATCH_MIN_INTERVAL seconds and doubles while nothing changes
+WATCH_MIN_INTERVAL = 2
+WATCH_MAX_INTERVAL = 60
+
+# Number of parallel segments used when the whole Drivers table is scanned (searching the list, migrating ride sets)
+DRIVER_SCAN_SEGMENTS = 4
+
+# Lazily paged lists: rows per page, fixed row height, and how close to the end a scroll triggers the next page
+LIST_PAGE_SIZE = 50
+LIST_ROW_HEIGHT = 48
+LIST_PREFETCH_PIXELS = 200
+
+# Seconds a roster pass (the list rows of a table read so far, shared by all sessions of the process) is listed from before a new one starts
+ROSTER_MAX_AGE = 15
+
+# Page opened by the map when there is no location to show
+DEFAULT_MAP_URL = "https://www.google.com/maps"
+
+# Driver location index: grid cell size in degrees (about 1.1 km of latitude) and how many nearby drivers to suggest
+LOCATION_CELL_DEGREES = 0.01
+NEAREST_DRIVERS = 3
+# Seconds the whole-roster driver location index is kept (current from the pages read meanwhile) before it is read again
+LOCATION_INDEX_MAX_AGE = 300
+EARTH_RADIUS_KM = 6371.0088
+
+# BatchGetItem: keys per request (the DynamoDB limit), chunks fetched at once, the first retry delay in seconds
+# and the requests sent for a chunk before its unprocessed keys are reported as throttling
+BATCH_GET_LIMIT = 100
+BATCH_GET_WORKERS = 4
+BATCH_GET_BACKOFF = 0.05
+BATCH_GET_MAX_ATTEMPTS = 6
+
+# Thread pool that runs DynamoDB and HTTP calls away from the Flet event handlers
+IO_WORKERS = 8
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="sts-io")
+
+# Instrumentation: every DynamoDB call and link expansion is timed and counted under the action (screen
+# handler) that started it. STS_METRICS_LOG names a file that also gets one JSON line per call, and
+# STS_DEBUG_PANEL shows a button that opens the totals in the app.
+METRICS_LOG_PATH = os.getenv("STS_METRICS_LOG")
+DEBUG_PANEL = bool(os.getenv("STS_DEBUG_PANEL"))
+METRICS_LATENCY_SAMPLES = 512
+current_action = contextvars.ContextVar('current_action', default='background')
+
+# Operations that read; the capacity the others consume is counted as write capacity
+READ_OPERATIONS = {'GetItem', 'BatchGetItem', 'Query', 'Scan', 'TransactGetItems'}
+
+def consumed_capacity_units(response):
+    """Sums the CapacityUnits of a response's ConsumedCapacity, which is a list for batch and transaction calls."""
+    consumed = response.get('ConsumedCapacity') or []
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return sum(float(capacity.get('CapacityUnits', 0)) for capacity in consumed)
+
+class CallMetrics:
+    """Per (action, operation) totals of calls, errors, latency, items, bytes and capacity, optionally logged as JSON lines."""
+
+    def __init__(self, log_path=None, samples=METRICS_LATENCY_SAMPLES):
+        self.log_path = log_path
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._log_fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644) if log_path else None
+
+    def record(self, operation, elapsed_ms, items=0, response_bytes=0, read_units=0.0, write_units=0.0, error=None):
+        action = current_action.get()
+        with self._lock:
+            stats = self._stats.get((action, operation))
+            if stats is None:
+                stats = self._stats[(action, operation)] = {
+                    'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'items': 0, 'bytes': 0,
+                    'read_units': 0.0, 'write_units': 0.0, 'latencies': deque(maxlen=self.samples)
+                }
+            stats['calls'] += 1
+            stats['errors'] += error is not None
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['items'] += items
+            stats['bytes'] += response_bytes
+            stats['read_units'] += read_units
+            stats['write_units'] += write_units
+            stats['latencies'].append(elapsed_ms)
+        if self._log_fd is not None:
+            os.write(self._log_fd, (json.dumps({
+                'at': now_ms(), 'action': action, 'operation': operation, 'ms': round(elapsed_ms, 3),
+                'items': items, 'bytes': response_bytes, 'read_units': read_units,
+                'write_units': write_units, 'error': error
+            }) + "\n").encode('utf-8'))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """Returns the totals as a list of plain dicts, sorted by action and operation."""
+        with self._lock:
+            entries = [(key, dict(stats), sorted(stats['latencies'])) for key, stats in self._stats.items()]
+        result = []
+        for (action, operation), stats, latencies in sorted(entries, key=lambda entry: entry[0]):
+            del stats['latencies']
+            stats['p50_ms'] = latencies[int(0.5 * (len(latencies) - 1))]
+            stats['p95_ms'] = latencies[int(0.95 * (len(latencies) - 1))]
+            result.append(dict(stats, action=action, operation=operation))
+        return result
+
+    def to_json(self):
+        return json.dumps({'generated_at': now_ms(), 'calls': self.snapshot()}, indent=2)
+
+    def to_prometheus(self):
+        """Renders the totals in the Prometheus text exposition format."""
+        series = (
+            ('sts_calls_total', 'counter', "Calls made", 'calls', 1),
+            ('sts_call_errors_total', 'counter', "Calls that failed", 'errors', 1),
+            ('sts_call_seconds_sum', 'counter', "Time spent in calls", 'total_ms', 0.001),
+            ('sts_call_seconds_max', 'gauge', "Slowest call", 'max_ms', 0.001),
+            ('sts_items_total', 'counter', "Items returned", 'items', 1),
+            ('sts_response_bytes_total', 'counter', "Response bytes received", 'bytes', 1),
+            ('sts_read_capacity_units_total', 'counter', "DynamoDB read capacity consumed", 'read_units', 1),
+            ('sts_write_capacity_units_total', 'counter', "DynamoDB write capacity consumed", 'write_units', 1),
+        )
+        snapshot = self.snapshot()
+        lines = []
+        for name, kind, help_text, field, scale in series:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stats in snapshot:
+                lines.append(f'{name}{{action="{stats["action"]}",operation="{stats["operation"]}"}} {stats[field] * scale:g}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, directory):
+        """Writes sts_metrics.json and sts_metrics.prom to the directory and returns their paths."""
+        paths = []
+        for file_name, content in (("sts_metrics.json", self.to_json()), ("sts_metrics.prom", self.to_prometheus())):
+            path = os.path.join(directory, file_name)
+            with open(path, 'w', encoding='utf-8') as metrics_file:
+                metrics_file.write(content)
+            paths.append(path)
+        return paths
+
+metrics = CallMetrics(METRICS_LOG_PATH)
+
+def traced_action(func):
+    """Attributes the calls a screen handler makes, including those of the background work it starts, to its name."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = current_action.set(func.__name__)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            current_action.reset(token)
+    return wrapper
 
-def get_employee_data(employee_id):
+def in_current_action(func):
+    """Wraps func to run under the caller's action on whichever thread ends up calling it."""
+    action = current_action.get()
+
+    def run(*args, **kwargs):
+        token = current_action.set(action)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            current_action.reset(token)
+    return run
+
+def instrument_dynamodb(client):
+    """Times every call of a DynamoDB client and asks DynamoDB for the capacity each one consumed."""
+    def request_capacity(params, model, **kwargs):
+        if 'ReturnConsumedCapacity' in model.input_shape.members:
+            params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+    def start_timer(context, **kwargs):
+        context['sts_started'] = time.perf_counter()
+
+    def record_call(http_response, parsed, model, context, **kwargs):
+        elapsed_ms = (time.perf_counter() - context.get('sts_started', time.perf_counter())) * 1000
+        if 'Items' in parsed:
+            items = len(parsed['Items'])
+        elif 'Responses' in parsed:
+            items = sum(len(table_items) for table_items in parsed['Responses'].values())
+        else:
+            items = int(bool(parsed.get('Item') or parsed.get('Attributes')))
+        units = consumed_capacity_units(parsed)
+        is_read = model.name in READ_OPERATIONS
+        metrics.record(
+            f"dynamodb.{model.name}", elapsed_ms, items, len(http_response.content or b""),
+            units if is_read else 0.0, 0.0 if is_read else units, parsed.get('Error', {}).get('Code')
+        )
+
+    def record_failure(exception, model, context, **kwargs):
+        elapsed_ms = (time.perf_counter() - context.get('sts_started', time.perf_counter())) * 1000
+        metrics.record(f"dynamodb.{model.name}", elapsed_ms, error=type(exception).__name__)
+
+    client.meta.events.register('before-parameter-build.dynamodb', request_capacity)
+    client.meta.events.register('before-call.dynamodb', start_timer)
+    client.meta.events.register('after-call.dynamodb', record_call)
+    client.meta.events.register('after-call-error.dynamodb', record_failure)
+
+def prewarm_dynamodb():
+    """Builds the DynamoDB resource and opens a signed connection in the background, while the user types.
+
+    DescribeEndpoints is the cheapest signed call there is; a role without permission for it
+    still gets the credentials resolved and the TLS connection pooled.
+    """
+    def prewarm():
+        # The worker is shared, so the action is put back for whatever task it runs next
+        token = current_action.set("prewarm")
+        try:
+            for table in (gov_employees_table, drivers_table, rides_table):
+                table.meta
+            dynamodb.meta.client.describe_endpoints()
+        except OFFLINE_ERRORS + (ClientError,):
+            pass
+        finally:
+            current_action.reset(token)
+
+    io_executor.submit(prewarm)
+
+def projection(attributes):
+    """Builds the ProjectionExpression arguments for a read, aliasing every attribute so reserved words like Name work."""
+    names = {f"#p{i}": attribute for i, attribute in enumerate(attributes)}
+    return {'ProjectionExpression': ", ".join(names), 'ExpressionAttributeNames': names}
+
+def project_item(item, attributes):
+    return {attribute: item[attribute] for attribute in attributes if attribute in item}
+
+def copy_item(item):
+    """Copies an item deep enough that callers can mutate its sets without touching the original."""
+    return {key: set(value) if isinstance(value, set) else value for key, value in item.items()}
+
+class ItemCache:
+    """Bounded LRU cache of table items, keyed by table name and ID, with a time-to-live per entry."""
+
+    def __init__(self, max_items=512, ttl_seconds=30):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, table_name, item_id):
+        key = (table_name, item_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, item = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy_item(item)
+
+    def put(self, table_name, item_id, item):
+        key = (table_name, item_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy_item(item))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, table_name, item_id):
+        with self._lock:
+            self._entries.pop((table_name, item_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+item_cache = ItemCache()
+
+def now_ms():
+    return int(time.time() * 1000)
+
+class ItemEncoder(json.JSONEncoder):
+    """JSON encoder for DynamoDB items, keeping Decimals and sets distinguishable on the way back."""
+
+    def default(self, value):
+        if isinstance(value, Decimal):
+            return {'__decimal__': str(value)}
+        if isinstance(value, (set, frozenset)):
+            return {'__set__': sorted(value, key=str)}
+        return super().default(value)
+
+def decode_item_value(value):
+    if '__decimal__' in value:
+        return Decimal(value['__decimal__'])
+    if '__set__' in value:
+        return set(value['__set__'])
+    return value
+
+def dump_item(item):
+    return json.dumps(item, cls=ItemEncoder)
+
+def load_item(body):
+    return json.loads(body, object_hook=decode_item_value)
+
+class LocalStore:
+    """SQLite mirror of Drivers/GovernmentEmployees items plus the writes queued while offline."""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS items (
+                    table_name TEXT, id TEXT, body TEXT, updated_at INTEGER,
+                    PRIMARY KEY (table_name, id)
+                );
+                CREATE TABLE IF NOT EXISTS pending_writes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT, body TEXT, queued_at INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS credentials (
+                    table_name TEXT, id TEXT, salt BLOB, password_hash BLOB,
+                    PRIMARY KEY (table_name, id)
+                );
+            """)
+
+    def get_item(self, table_name, item_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM items WHERE table_name = ? AND id = ?", (table_name, str(item_id))
+            ).fetchone()
+        return load_item(row[0]) if row else None
+
+    def items(self, table_name):
+        with self._lock:
+            rows = self._conn.execute("SELECT body FROM items WHERE table_name = ?", (table_name,)).fetchall()
+        return [load_item(row[0]) for row in rows]
+
+    def item_ids(self, table_name):
+        """IDs of the items mirrored for a table keyed by ID."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM items WHERE table_name = ?", (table_name,)).fetchall()
+        return [Decimal(row[0]) for row in rows]
+
+    @staticmethod
+    def _rows(table_name, items, item_key):
+        return [
+            (table_name, item_key(item) if item_key else str(item['ID']), dump_item(item), int(item.get('UpdatedAt', 0)))
+            for item in items
+        ]
+
+    def put_items(self, table_name, items, item_key=None):
+        """Stores items under str(item['ID']), or under item_key(item) for tables keyed otherwise."""
+        rows = self._rows(table_name, items, item_key)
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?)", rows)
+
+    def put_item(self, table_name, item, item_key=None):
+        self.put_items(table_name, [item], item_key)
+
+    def delete_item(self, table_name, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM items WHERE table_name = ? AND id = ?", (table_name, key))
+
+    def replace_items(self, table_name, keys, items, item_key=None):
+        """Replaces the items stored under keys with items, in one transaction, so deleted ones go too."""
+        rows = self._rows(table_name, items, item_key)
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM items WHERE table_name = ? AND id = ?", [(table_name, key) for key in keys])
+            self._conn.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?)", rows)
+
+    def queue_write(self, table_name, write):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO pending_writes (table_name, body, queued_at) VALUES (?, ?, ?)",
+                (table_name, dump_item(write), now_ms())
+            )
+
+    def pending_writes(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT seq, table_name, body, queued_at FROM pending_writes ORDER BY seq").fetchall()
+        return [(seq, table_name, load_item(body), queued_at) for seq, table_name, body, queued_at in rows]
+
+    def remove_write(self, seq):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pending_writes WHERE seq = ?", (seq,))
+
+    def set_password(self, table_name, item_id, password):
+        """Remembers a salted hash of the password of an account that signed in on this device."""
+        salt = os.urandom(16)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO credentials VALUES (?, ?, ?, ?)",
+                (table_name, str(item_id), salt, hash_password(password, salt))
+            )
+
+    def check_password(self, table_name, item_id, password):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT salt, password_hash FROM credentials WHERE table_name = ? AND id = ?", (table_name, str(item_id))
+            ).fetchone()
+        return row is not None and hmac.compare_digest(row[1], hash_password(password, row[0]))
+
+def hash_password(password, salt):
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 100_000)
+
+class LazyLocalStore:
+    """The LocalStore, opened (and its schema created) on first use rather than at import."""
+
+    def __init__(self, path):
+        self.path = path
+        self._store = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        store = self._store
+        if store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = LocalStore(self.path)
+                store = self._store
+        return getattr(store, name)
+
+local_store = LazyLocalStore(LOCAL_STORE_PATH)
+
+UPDATE_ACTION = re.compile(r'\b(SET|REMOVE|ADD|DELETE)\b')
+
+def parse_update_expression(update_expression):
+    """Splits a simple update expression into (action, attribute, placeholder) clauses."""
+    parts = UPDATE_ACTION.split(update_expression)
+    clauses = []
+    for action, body in zip(parts[1::2], parts[2::2]):
+        for clause in body.split(','):
+            clause = clause.strip()
+            if not clause:
+                continue
+            if action == 'SET':
+                attribute, placeholder = (part.strip() for part in clause.split('=', 1))
+            elif action == 'REMOVE':
+                attribute, placeholder = clause, None
+            else:
+                attribute, placeholder = clause.split()
+            clauses.append((action, attribute, placeholder))
+    return clauses
+
+def add_set_action(update_expression, action):
+    """Adds an 'attribute = :value' action to the SET clause of an update expression."""
+    match = re.search(r'\bSET\b', update_expression)
+    if match:
+        return f"{update_expression[:match.end()]} {action},{update_expression[match.end():]}"
+    return f"{update_expression} SET {action}"
+
+def apply_update_expression(item, update_expression, expression_values, expression_names=None):
+    """Applies a simple SET/REMOVE/ADD/DELETE update expression to a local copy of an item."""
+    expression_names = expression_names or {}
+    item = copy_item(item)
+    for action, attribute, placeholder in parse_update_expression(update_expression):
+        attribute = expression_names.get(attribute, attribute)
+        value = expression_values.get(placeholder)
+        if action == 'SET':
+            item[attribute] = value
+        elif action == 'REMOVE':
+            item.pop(attribute, None)
+        elif action == 'ADD':
+            item[attribute] = set(item.get(attribute, set())) | value if isinstance(value, set) else item.get(attribute, 0) + value
+        else:
+            remaining = set(item.get(attribute, set())) - value
+            if remaining:
+                item[attribute] = remaining
+            else:
+                item.pop(attribute, None)
+    return item
+
+def peek_item(table_name, item_id):
+    """Returns the cached or locally mirrored copy of an item without touching the network."""
+    return item_cache.get(table_name, item_id) or local_store.get_item(table_name, item_id)
+
+def get_item_data(table_name, item_id, force_refresh=False):
+    """Reads an item through the cache; falls back to the local mirror when DynamoDB is unreachable."""
+    if not force_refresh:
+        cached = item_cache.get(table_name, item_id)
+        if cached is not None:
+            return cached
+    response = tables[table_name].get_item(Key={'ID': item_id}, **projection(ITEM_ATTRIBUTES[table_name]))
+    item = response.get('Item', None)
+    if item is not None:
+        item_cache.put(table_name, item_id, item)
+        local_store.put_item(table_name, item)
+    return item
+
+def get_employee_data(employee_id, force_refresh=False):
     try:
-        response = gov_employees_table.get_item(Key={'ID': employee_id})
-        return response.get('Item', None)
+        return get_item_data('GovernmentEmployees', employee_id, force_refresh)
+    except OFFLINE_ERRORS as e:
+        print(f"Offline, reading employee data from the local store: {e}")
+        return local_store.get_item('GovernmentEmployees', employee_id)
     except ClientError as e:
         print(f"Error fetching employee data: {e}")
         return None
 
-def get_driver_data(driver_id):
+def get_driver_data(driver_id, force_refresh=False):
     try:
-        response = drivers_table.get_item(Key={'ID': driver_id})
-        return response.get('Item', None)
+        return get_item_data('Drivers', driver_id, force_refresh)
+    except OFFLINE_ERRORS as e:
+        print(f"Offline, reading driver data from the local store: {e}")
+        return local_store.get_item('Drivers', driver_id)
     except ClientError as e:
         print(f"Error fetching driver data: {e}")
         return None
 
+def batch_get_items(table, keys, **request_kwargs):
+    """Reads the given keys with BatchGetItem and returns the items found, in no particular order.
+
+    Keys are sent in chunks of BATCH_GET_LIMIT, up to BATCH_GET_WORKERS chunks at a time,
+    and whatever DynamoDB leaves in UnprocessedKeys is retried with exponential backoff. Keys
+    still unprocessed after BATCH_GET_MAX_ATTEMPTS requests raise a throttling ClientError,
+    so callers handle them like any other throttled read.
+    """
+    def get_chunk(chunk_keys):
+        chunk_items = []
+        request_items = {table.name: dict(request_kwargs, Keys=chunk_keys)}
+        for attempt in range(1, BATCH_GET_MAX_ATTEMPTS + 1):
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            chunk_items.extend(response['Responses'].get(table.name, []))
+            request_items = response.get('UnprocessedKeys')
+            if not request_items:
+                return chunk_items
+            if attempt < BATCH_GET_MAX_ATTEMPTS:
+                time.sleep(min(BATCH_GET_BACKOFF * 2 ** attempt, 1))
+        unprocessed = len(request_items[table.name]['Keys'])
+        raise ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException',
+                                     'Message': f"{unprocessed} keys still unprocessed after {BATCH_GET_MAX_ATTEMPTS} requests"}},
+                          'BatchGetItem')
+
+    chunks = [keys[start:start + BATCH_GET_LIMIT] for start in range(0, len(keys), BATCH_GET_LIMIT)]
+    if len(chunks) <= 1:
+        return get_chunk(chunks[0]) if chunks else []
+
+    items = []
+    with ThreadPoolExecutor(max_workers=min(len(chunks), BATCH_GET_WORKERS)) as executor:
+        for chunk_items in executor.map(in_current_action(get_chunk), chunks):
+            items.extend(chunk_items)
+    return items
+
+def get_items_data(table_name, item_ids, force_refresh=False):
+    """Reads many items by ID in one batched round trip; returns {ID: item} for those that exist.
+
+    Cached items are served from the cache, and everything fetched is cached and mirrored
+    like a single get_item_data read.
+    """
+    items = {}
+    missing_ids = []
+    for item_id in dict.fromkeys(item_ids):
+        cached = None if force_refresh else item_cache.get(table_name, item_id)
+        if cached is not None:
+            items[item_id] = cached
+        else:
+            missing_ids.append(item_id)
+    if missing_ids:
+        fetched = batch_get_items(
+            tables[table_name], [{'ID': item_id} for item_id in missing_ids], **projection(ITEM_ATTRIBUTES[table_name])
+        )
+        for item in fetched:
+            item_cache.put(table_name, item['ID'], item)
+            items[item['ID']] = item
+        local_store.put_items(table_name, fetched)
+    return items
+
+def get_employees_data(employee_ids, force_refresh=False):
+    try:
+        return get_items_data('GovernmentEmployees', employee_ids, force_refresh)
+    except OFFLINE_ERRORS as e:
+        print(f"Offline, reading employee data from the local store: {e}")
+        return local_items('GovernmentEmployees', employee_ids)
+    except ClientError as e:
+        print(f"Error fetching employee data: {e}")
+        return {}
+
+def local_items(table_name, item_ids):
+    items = {item_id: local_store.get_item(table_name, item_id) for item_id in item_ids}
+    return {item_id: item for item_id, item in items.items() if item is not None}
+
+def is_throttled(error):
+    """Tells whether a ClientError means DynamoDB refused the request for load, so it is worth sending again later."""
+    code = error.response['Error']['Code']
+    if code == 'TransactionCanceledException':
+        reasons = {reason.get('Code') for reason in error.response.get('CancellationReasons', [])}
+        return 'ConditionalCheckFailed' not in reasons and bool(reasons & THROTTLED_CANCELLATIONS)
+    return code in THROTTLING_ERRORS
+
+# Set while writes queued because of throttling wait for the sync loop, which then retries them sooner
+throttled_writes = threading.Event()
+
+def write_item_update(table_name, item_id, update_expression, expression_values, expression_names=None):
+    """Sends one update_item stamped with UpdatedAt and refreshes the cache and mirror from ALL_NEW."""
+    update_params = {
+        'Key': {'ID': item_id},
+        'UpdateExpression': add_set_action(update_expression, "UpdatedAt = :updated_at"),
+        'ExpressionAttributeValues': dict(expression_values, **{":updated_at": now_ms()}),
+        'ReturnValues': 'ALL_NEW'
+    }
+    if expression_names:
+        update_params['ExpressionAttributeNames'] = expression_names
+    response = tables[table_name].update_item(**update_params)
+    updated_item = project_item(response.get('Attributes'), ITEM_ATTRIBUTES[table_name])
+    item_cache.put(table_name, item_id, updated_item)
+    local_store.put_item(table_name, updated_item)
+    return updated_item
+
+def queue_item_update(table_name, item_id, update_expression, expression_values, expression_names=None):
+    """Queues a write for the next sync and returns the item as it will look once the write goes through."""
+    item = peek_item(table_name, item_id) or {'ID': item_id}
+    local_store.queue_write(table_name, {
+        'ID': item_id,
+        'UpdateExpression': update_expression,
+        'ExpressionAttributeValues': expression_values,
+        'ExpressionAttributeNames': expression_names
+    })
+    updated_item = apply_update_expression(item, update_expression, expression_values, expression_names)
+    item_cache.put(table_name, item_id, updated_item)
+    local_store.put_item(table_name, updated_item)
+    return updated_item
+
 def update_driver_data(driver_id, update_expression, expression_values, expression_names=None):
+    """Updates a driver in a single round trip and returns the updated item, or None on failure.
+
+    While offline the write is queued in the local store and the locally updated item is returned.
+    """
     try:
         if all(len(val) > 0 for val in expression_values.values() if isinstance(val, set)):
-            update_params = {
-                'Key': {'ID': driver_id},
-                'UpdateExpression': update_expression,
-                'ExpressionAttributeValues': expression_values
-            }
-            if expression_names:
-                update_params['ExpressionAttributeNames'] = expression_names
-            drivers_table.update_item(**update_params)
+            return write_item_update('Drivers', driver_id, update_expression, expression_values, expression_names)
         else:
             print("Validation failed: One or more sets are empty.")
+    except OFFLINE_ERRORS as e:
+        print(f"Offline, queuing driver update: {e}")
+        return queue_item_update('Drivers', driver_id, update_expression, expression_values, expression_names)
     except ClientError as e:
+        if is_throttled(e):
+            print(f"Throttled, queuing driver update: {e}")
+            throttled_writes.set()
+            return queue_item_update('Drivers', driver_id, update_expression, expression_values, expression_names)
         print(f"Error updating driver data: {e}")
+    return None
 
 def update_employee_data(employee_id, update_expression, expression_values, expression_names=None):
+    """Updates an employee in a single round trip and returns the updated item, or None on failure."""
     try:
         if all(len(val) > 0 for val in expression_values.values() if isinstance(val, set)):
-            update_params = {
-                'Key': {'ID': employee_id},
-                'UpdateExpression': update_expression,
-                'ExpressionAttributeValues': expression_values
-            }
-            if expression_names:
-                update_params['ExpressionAttributeNames'] = expression_names
-            gov_employees_table.update_item(**update_params)
+            return write_item_update('GovernmentEmployees', employee_id, update_expression, expression_values, expression_names)
         else:
             print("Validation failed: One or more sets are empty.")
+    except OFFLINE_ERRORS as e:
+        print(f"Offline, queuing employee update: {e}")
+        return queue_item_update('GovernmentEmployees', employee_id, update_expression, expression_values, expression_names)
     except ClientError as e:
+        if is_throttled(e):
+            print(f"Throttled, queuing employee update: {e}")
+            throttled_writes.set()
+            return queue_item_update('GovernmentEmployees', employee_id, update_expression, expression_values, expression_names)
         print(f"Error updating employee data: {e}")
+    return None
 
-def ensure_set_attribute_exists(table, item_id, attribute_name):
-    """Ensures a set attribute exists for a given table, initializing it if necessary."""
-    item = get_employee_data(item_id) if table == 'GovernmentEmployees' else get_driver_data(item_id)
-    if attribute_name not in item:
-        update_expression = f"SET {attribute_name} = :empty_set"
-        update_data = {":empty_set": set()}
-        if table == 'GovernmentEmployees':
-            update_employee_data(item_id, update_expression, update_data)
+@functools.lru_cache(maxsize=None)
+def item_deserializer():
+    from boto3.dynamodb.types import TypeDeserializer
+    return TypeDeserializer()
+
+def cache_raw_item(table_name, raw_item):
+    """Deserializes an item returned in low-level form (ALL_OLD of a failed condition) and caches it like a fresh read."""
+    item = project_item({key: item_deserializer().deserialize(value) for key, value in raw_item.items()}, ITEM_ATTRIBUTES[table_name])
+    item_cache.put(table_name, item['ID'], item)
+    local_store.put_item(table_name, item)
+    return item
+
+def ride_key(state, employee_id):
+    return f"{state}#{employee_id}"
+
+def ride_store_key(ride):
+    return f"{ride['DriverID']}#{ride['RideKey']}"
+
+def store_ride_changes(ride_changes):
+    """Applies {(DriverID, RideKey): ride item, or None when it is gone} to the local mirror of the Rides table."""
+    for (driver_id, key), ride in ride_changes.items():
+        if ride is None:
+            local_store.delete_item('Rides', f"{driver_id}#{key}")
         else:
-            update_driver_data(item_id, update_expression, update_data)
+            local_store.put_item('Rides', ride, ride_store_key)
+
+def merge_rides(rides, ride_changes):
+    """Returns a ride list with the changes reported by a RideResult applied."""
+    merged = {(ride['DriverID'], ride['RideKey']): ride for ride in rides}
+    for key, ride in ride_changes.items():
+        if ride is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = ride
+    return list(merged.values())
+
+class RideOutcome(enum.Enum):
+    DONE = 'done'
+    QUEUED = 'queued'
+    CONFLICT = 'conflict'
+    FULL = 'full'
+    FAILED = 'failed'
+
+# Result of a ride transition. driver is the driver item as it now stands (None when unknown), and rides maps
+# each (DriverID, RideKey) the transition touched or found in its way to the ride item now there, or None.
+RideResult = namedtuple('RideResult', ['outcome', 'driver', 'rides'])
+
+# Every ride state change as (state of the ride item it deletes, state of the ride item it creates,
+# change to the driver's PassengerCount). Each one also bumps the driver's Version, which counts the
+# ride changes of a driver so that watchers notice them and screens can tell an older copy from a newer one.
+RIDE_TRANSITIONS = {
+    'request': (None, 'RideRequests', 0),
+    'accept': ('RideRequests', 'Passengers', 1),
+    'deny': ('RideRequests', None, 0),
+    'cancel': ('RideRequests', None, 0),
+    'remove': ('Passengers', None, -1),
+}
+
+def ride_transition_actions(transition, driver_id, employee_id, employee_name=None, updated_at=None):
+    """Builds the TransactWriteItems actions of a ride transition and the ride changes they make once applied.
+
+    The ride being deleted must exist and the one being created must not; a request also
+    needs the employee not to be a passenger already, and an accept needs a free seat by the
+    driver item's own Seats (DEFAULT_SEATS when it has none).
+    """
+    removed_state, added_state, passenger_change = RIDE_TRANSITIONS[transition]
+    updated_at = updated_at or now_ms()
+    actions = []
+    ride_changes = {}
+
+    def ride_action(action, key, condition):
+        params = {'TableName': rides_table.name, 'ConditionExpression': condition, 'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'}
+        params.update(key)
+        actions.append({action: params})
+
+    if removed_state:
+        key = ride_key(removed_state, employee_id)
+        ride_action('Delete', {'Key': {'DriverID': driver_id, 'RideKey': key}}, "attribute_exists(RideKey)")
+        ride_changes[(driver_id, key)] = None
+    if added_state:
+        ride = {
+            'DriverID': driver_id, 'RideKey': ride_key(added_state, employee_id), 'State': added_state,
+            'EmployeeID': employee_id, 'EmployeeName': employee_name, 'UpdatedAt': updated_at
+        }
+        ride_action('Put', {'Item': ride}, "attribute_not_exists(RideKey)")
+        ride_changes[(driver_id, ride['RideKey'])] = ride
+    if transition == 'request':
+        key = ride_key('Passengers', employee_id)
+        ride_action('ConditionCheck', {'Key': {'DriverID': driver_id, 'RideKey': key}}, "attribute_not_exists(RideKey)")
+
+    driver_update = {
+        'TableName': drivers_table.name,
+        'Key': {'ID': driver_id},
+        'UpdateExpression': "SET UpdatedAt = :updated_at ADD Version :one",
+        'ConditionExpression': "attribute_exists(ID)",
+        'ExpressionAttributeValues': {":updated_at": updated_at, ":one": 1},
+        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+    }
+    if passenger_change:
+        driver_update['UpdateExpression'] += ", PassengerCount :passengers"
+        driver_update['ExpressionAttributeValues'][":passengers"] = passenger_change
+    if passenger_change > 0:
+        driver_update['ConditionExpression'] += (
+            " AND (attribute_not_exists(PassengerCount) OR PassengerCount < Seats"
+            " OR (attribute_not_exists(Seats) AND PassengerCount < :default_seats))"
+        )
+        driver_update['ExpressionAttributeValues'][":default_seats"] = DEFAULT_SEATS
+    actions.append({'Update': driver_update})
+    return actions, ride_changes
+
+def bump_driver(driver_id, passenger_change, updated_at, queued):
+    """Returns the local copy of a driver with a transition's Version/PassengerCount change applied, if there is one.
+
+    A sent transition also stamps it with the transaction's UpdatedAt, the version the server
+    now has; a queued one keeps the UpdatedAt it was read with until the server has the change.
+    """
+    driver = peek_item('Drivers', driver_id)
+    if driver is None:
+        return None
+    driver = dict(
+        driver,
+        Version=driver.get('Version', 0) + 1,
+        PassengerCount=max(driver.get('PassengerCount', 0) + passenger_change, 0)
+    )
+    if not queued:
+        driver['UpdatedAt'] = updated_at
+    item_cache.put('Drivers', driver_id, driver)
+    local_store.put_item('Drivers', driver)
+    return driver
+
+def canceled_ride_result(transition, actions, reasons):
+    """Turns the CancellationReasons of a refused transition into a RideResult with what is in the way."""
+    driver = None
+    ride_changes = {}
+    for action, reason in zip(actions, reasons):
+        if reason.get('Code') != 'ConditionalCheckFailed':
+            continue
+        params = next(iter(action.values()))
+        raw_item = reason.get('Item')
+        if params['TableName'] == drivers_table.name:
+            driver = cache_raw_item('Drivers', raw_item) if raw_item else None
+        else:
+            key = params['Key'] if 'Key' in params else params['Item']
+            ride = {name: item_deserializer().deserialize(value) for name, value in raw_item.items()} if raw_item else None
+            ride_changes[(key['DriverID'], key['RideKey'])] = ride
+    store_ride_changes(ride_changes)
+    if transition == 'accept' and driver is not None and not ride_changes:
+        return RideResult(RideOutcome.FULL, driver, ride_changes)
+    return RideResult(RideOutcome.CONFLICT, driver, ride_changes)
+
+def queue_ride_transition(transition, driver_id, employee_id, employee_name):
+    local_store.queue_write('Rides', {
+        'Transition': transition, 'DriverID': driver_id, 'EmployeeID': employee_id, 'EmployeeName': employee_name
+    })
+    return RideOutcome.QUEUED
+
+def transition_ride(transition, driver_id, employee_id, employee_name=None):
+    """Applies one ride state change as a single transaction and returns a RideResult.
+
+    The conditions are checked by DynamoDB, not against a local copy, so two drivers or a
+    driver and an employee cannot both win. A refused transaction reports the items that
+    were in the way (ALL_OLD), so the caller can show them without another read.
+    """
+    updated_at = now_ms()
+    passenger_change = RIDE_TRANSITIONS[transition][2]
+    actions, ride_changes = ride_transition_actions(transition, driver_id, employee_id, employee_name, updated_at)
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=actions)
+        outcome = RideOutcome.DONE
+    except OFFLINE_ERRORS as e:
+        print(f"Offline, queuing ride {transition}: {e}")
+        outcome = queue_ride_transition(transition, driver_id, employee_id, employee_name)
+    except ClientError as e:
+        if is_throttled(e):
+            print(f"Throttled, queuing ride {transition}: {e}")
+            throttled_writes.set()
+            outcome = queue_ride_transition(transition, driver_id, employee_id, employee_name)
+        elif e.response['Error']['Code'] != 'TransactionCanceledException':
+            print(f"Error updating ride: {e}")
+            return RideResult(RideOutcome.FAILED, None, {})
+        else:
+            return canceled_ride_result(transition, actions, e.response.get('CancellationReasons', []))
+    store_ride_changes(ride_changes)
+    return RideResult(outcome, bump_driver(driver_id, passenger_change, updated_at, outcome == RideOutcome.QUEUED), ride_changes)
 
-def check_credentials(table, user_id, user_password):
-    user_data = get_employee_data(user_id) if table == 'GovernmentEmployees' else get_driver_data(user_id)
-    if user_data and user_data['Password'] == user_password:
-        return user_data
+def replay_ride_transition(write):
+    """Sends a ride transition queued while offline; it is dropped if its conditions no longer hold."""
+    actions, _ = ride_transition_actions(write['Transition'], write['DriverID'], write['EmployeeID'], write['EmployeeName'])
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=actions)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException' or is_throttled(e):
+            raise
+        print(f"Dropping queued ride {write['Transition']} for driver {write['DriverID']}: the ride changed on the server.")
+    item_cache.invalidate('Drivers', write['DriverID'])
+
+def replay_pending_writes():
+    """Pushes writes queued while offline or throttled, oldest first. Returns False if DynamoDB is still
+    unreachable or throttling, leaving the rest queued.
+
+    Item updates are applied as queued (only an item's owner sets its scalar attributes); ride
+    transitions are re-checked by their transaction.
+    """
+    for seq, table_name, write, queued_at in local_store.pending_writes():
+        try:
+            if table_name == 'Rides':
+                replay_ride_transition(write)
+            else:
+                write_item_update(
+                    table_name, write['ID'], write['UpdateExpression'], write['ExpressionAttributeValues'], write['ExpressionAttributeNames']
+                )
+        except OFFLINE_ERRORS:
+            return False
+        except ClientError as e:
+            if is_throttled(e):
+                return False
+            print(f"Error replaying queued write: {e}")
+        local_store.remove_write(seq)
+    return True
+
+def pull_mirrored_items(table_name):
+    """Re-reads the items mirrored for a table with batched gets by key, and drops those deleted on the server.
+
+    Only what was read on this device is mirrored, so the cost follows the items the
+    signed-in users have opened rather than the size of the table.
+    """
+    item_ids = local_store.item_ids(table_name)
+    if not item_ids:
+        return
+    fetched = get_items_data(table_name, item_ids, force_refresh=True)
+    for item_id in item_ids:
+        if item_id not in fetched:
+            local_store.delete_item(table_name, str(item_id))
+            item_cache.invalidate(table_name, item_id)
+
+def signed_in_accounts():
+    """(table name, ID) of the accounts signed in to the sessions of this process."""
+    accounts = set()
+    for session in list(live_sessions):
+        table_name, user = session.state.table_name, session.state.user
+        if table_name is not None and user is not None:
+            accounts.add((table_name, user['ID']))
+    return accounts
+
+def pull_account_rides(table_name, account_id):
+    """Replaces the mirrored rides of an account with those in its Rides partition (drivers) or index (employees)."""
+    owner, query_rides = RIDE_OWNERS[table_name]
+    rides = query_rides(account_id)
+    mirrored = [ride_store_key(ride) for ride in local_store.items('Rides') if ride[owner] == account_id]
+    local_store.replace_items('Rides', mirrored, rides, ride_store_key)
+
+def sync_local_store():
+    """Pushes queued writes and, once they are all through, refreshes the items in the local mirror
+    and the rides of the signed-in accounts."""
+    if not replay_pending_writes():
+        return False
+    for table_name in tables:
+        pull_mirrored_items(table_name)
+    for table_name, account_id in signed_in_accounts():
+        pull_account_rides(table_name, account_id)
+    return True
+
+local_sync_lock = threading.Lock()
+local_sync_thread = None
+
+def start_local_sync():
+    """Starts the background sync loop once per process."""
+    global local_sync_thread
+    with local_sync_lock:
+        if local_sync_thread is not None:
+            return
+
+        def sync_loop():
+            current_action.set("local_sync")
+            while True:
+                try:
+                    if sync_local_store():
+                        throttled_writes.clear()
+                except OFFLINE_ERRORS:
+                    pass
+                except Exception as e:
+                    # Anything else is logged and retried on the next round, so queued writes are never stranded
+                    print(f"Error syncing local store: {e}")
+                # A write throttled in the meantime cuts the wait short
+                if throttled_writes.is_set() or throttled_writes.wait(LOCAL_SYNC_INTERVAL):
+                    time.sleep(THROTTLED_REPLAY_INTERVAL)
+
+        local_sync_thread = threading.Thread(target=sync_loop, name="sts-sync", daemon=True)
+        local_sync_thread.start()
+
+def query_driver_rides(driver_id):
+    return query_table(rides_table, KeyConditionExpression="DriverID = :driver_id", ExpressionAttributeValues={":driver_id": driver_id})
+
+def query_employee_rides(employee_id):
+    return query_table(rides_table, IndexName=RIDES_BY_EMPLOYEE, KeyConditionExpression="EmployeeID = :employee_id",
+                       ExpressionAttributeValues={":employee_id": employee_id})
+
+# How the rides of an account are found: the attribute naming it on a ride item, and the query reading them
+RIDE_OWNERS = {
+    'Drivers': ('DriverID', query_driver_rides),
+    'GovernmentEmployees': ('EmployeeID', query_employee_rides),
+}
+
+def get_driver_rides(driver_id):
+    """Returns the ride items (requests and passengers) of a driver, read with one query on its partition."""
+    try:
+        return query_driver_rides(driver_id)
+    except OFFLINE_ERRORS as e:
+        print(f"Offline, reading rides from the local store: {e}")
+        return [ride for ride in local_store.items('Rides') if ride['DriverID'] == driver_id]
+    except ClientError as e:
+        print(f"Error fetching rides: {e}")
+        return []
+
+def get_employee_rides(employee_id):
+    """Returns the ride items of an employee through the EmployeeRides index."""
+    try:
+        return query_employee_rides(employee_id)
+    except OFFLINE_ERRORS as e:
+        print(f"Offline, reading rides from the local store: {e}")
+        return [ride for ride in local_store.items('Rides') if ride['EmployeeID'] == employee_id]
+    except ClientError as e:
+        print(f"Error fetching rides: {e}")
+        return []
+
+def get_rider_locations(rides):
+    """Returns {EmployeeID: (latitude, longitude)} for the employees of the given rides, in one batched read."""
+    employee_ids = [ride['EmployeeID'] for ride in rides]
+    if not employee_ids:
+        return {}
+    employees = get_employees_data(employee_ids)
+    locations = {}
+    for employee_id, employee in employees.items():
+        coordinates = link_coordinates(employee['MapLocation']) if employee.get('MapLocation') else None
+        if coordinates is not None:
+            locations[employee_id] = coordinates
+    return locations
+
+def migrate_ride_sets():
+    """One-time move of the RideRequests/Passengers name sets on Drivers items into the Rides table.
+
+    Names are matched to employees by Name. A driver with a name that matches no employee, or
+    several, is left untouched (sets kept, no ride items) and reported, so it can be fixed by
+    hand and the migration run again. Returns the IDs of the drivers left untouched.
+    """
+    employee_ids = {}
+    for employee in scan_table(gov_employees_table, **projection(('ID', 'Name'))):
+        employee_ids.setdefault(employee['Name'], []).append(employee['ID'])
+    for employee_name, ids in employee_ids.items():
+        if len(ids) > 1:
+            print(f"Employees {', '.join(str(employee_id) for employee_id in sorted(ids))} share the name '{employee_name}'.")
+    drivers = [driver for driver in scan_table(drivers_table, DRIVER_SCAN_SEGMENTS, **projection(('ID',) + RIDE_STATES))
+               if any(state in driver for state in RIDE_STATES)]
+    migrated = []
+    kept = []
+    for driver in drivers:
+        unresolved = [(state, employee_name) for state in RIDE_STATES for employee_name in driver.get(state, [])
+                      if len(employee_ids.get(employee_name, ())) != 1]
+        for state, employee_name in unresolved:
+            reason = "several employees have" if employee_name in employee_ids else "no employee has"
+            print(f"Keeping the ride sets of driver {driver['ID']}: {reason} the name '{employee_name}' ({state}).")
+        (kept if unresolved else migrated).append(driver)
+    with rides_table.batch_writer() as batch:
+        for driver in migrated:
+            for state in RIDE_STATES:
+                for employee_name in driver.get(state, []):
+                    employee_id = employee_ids[employee_name][0]
+                    batch.put_item(Item={
+                        'DriverID': driver['ID'], 'RideKey': ride_key(state, employee_id), 'State': state,
+                        'EmployeeID': employee_id, 'EmployeeName': employee_name, 'UpdatedAt': now_ms()
+                    })
+    for driver in migrated:
+        drivers_table.update_item(
+            Key={'ID': driver['ID']},
+            UpdateExpression="SET PassengerCount = :count, UpdatedAt = :updated_at ADD Version :one REMOVE RideRequests, Passengers",
+            ExpressionAttributeValues={":count": len(driver.get('Passengers', [])), ":updated_at": now_ms(), ":one": 1}
+        )
+    return [driver['ID'] for driver in kept]
+
+def query_table(table, **query_kwargs):
+    """Runs a query to the end, following LastEvaluatedKey."""
+    items = []
+    while True:
+        response = table.query(**query_kwargs)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+def scan_table(table, total_segments=1, decode=None, **scan_kwargs):
+    """Scans a whole table following LastEvaluatedKey, optionally in parallel segments and decoding raw items with decode."""
+    def scan_segment(segment):
+        params = dict(scan_kwargs)
+        if total_segments > 1:
+            params['Segment'] = segment
+            params['TotalSegments'] = total_segments
+        if decode is not None:
+            params['TableName'] = table.name
+        scan = table.scan if decode is None else dynamodb.client.scan
+        segment_items = []
+        while True:
+            response = scan(**params)
+            page_items = response.get('Items', [])
+            if decode is not None:
+                page_items = [decode(raw_item) for raw_item in page_items]
+            segment_items.extend(page_items)
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return segment_items
+            params['ExclusiveStartKey'] = last_key
+
+    if total_segments <= 1:
+        return scan_segment(0)
+
+    items = []
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        for segment_items in executor.map(in_current_action(scan_segment), range(total_segments)):
+            items.extend(segment_items)
+    return items
+
+def set_driver_status(driver_id, new_status):
+    return update_driver_data(driver_id, "SET #status = :s", {":s": new_status}, {"#status": "Status"})
+
+# Google Maps link expansion: one pooled session (created, with requests, on the first link), bounded timeouts
+# and a cache of expanded links
+URL_EXPANSION_TIMEOUT = (3.05, 10)
+
+@functools.lru_cache(maxsize=None)
+def http_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=IO_WORKERS))
+    session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=IO_WORKERS))
+    return session
+
+map_link_cache = ItemCache(max_items=1024, ttl_seconds=24 * 60 * 60)
+
+MAP_COORDINATE = r'([-+]?\d{1,3}(?:\.\d+)?)'
+MAP_COORDINATE_SEPARATOR = r'(?:,|%2C)(?:\+|%20|\s)*'
+MAP_COORDINATE_PAIR = MAP_COORDINATE + MAP_COORDINATE_SEPARATOR + MAP_COORDINATE
+
+# URL shapes returned by Google Maps, most precise first: the place pin (!3d/!4d) beats
+# the viewport centre (@lat,lng,zoom), which beats search and query parameters.
+MAP_COORDINATE_PATTERNS = (
+    re.compile(r'!3d' + MAP_COORDINATE + r'!4d' + MAP_COORDINATE),
+    re.compile(r'@' + MAP_COORDINATE_PAIR),
+    re.compile(r'/search/' + MAP_COORDINATE_PAIR),
+    re.compile(r'[?&](?:q|query|destination|daddr)=(?:loc:)?' + MAP_COORDINATE_PAIR),
+    re.compile(r'[?&](?:ll|sll|center)=' + MAP_COORDINATE_PAIR),
+)
+
+@functools.lru_cache(maxsize=4096)
+def parse_coordinates(url):
+    """Extracts (latitude, longitude) from a Google Maps URL, or returns None."""
+    for pattern in MAP_COORDINATE_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            latitude, longitude = float(match.group(1)), float(match.group(2))
+            if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+                return latitude, longitude
     return None
 
+def parse_coordinates_batch(items, attribute='MapLocation'):
+    """Parses the location of every item in one pass; returns {ID: (latitude, longitude)} for those that have one."""
+    coordinates = {}
+    for item in items:
+        location = item.get(attribute)
+        if location:
+            parsed = parse_coordinates(location)
+            if parsed is not None:
+                coordinates[item['ID']] = parsed
+    return coordinates
+
+def expand_location(location_link):
+    """Follows the redirects of a shared link and returns {'URL', 'Coordinates'}, or None on failure.
+
+    Successful results are cached for a day under both the short and the expanded link, since
+    drivers keep re-sharing the same pickup points. Error responses (404, 429...) are not
+    cached, so a link that was rate limited once is tried again on the next use.
+    """
+    location_link = location_link.strip()
+    cached = map_link_cache.get('MapLinks', location_link)
+    if cached is not None:
+        return cached
+    import requests
+
+    started = time.perf_counter()
+    try:
+        response = http_session().head(location_link, allow_redirects=True, timeout=URL_EXPANSION_TIMEOUT)
+    except requests.RequestException as e:
+        metrics.record("http.HEAD", (time.perf_counter() - started) * 1000, error=type(e).__name__)
+        print(f"Error expanding URL: {e}")
+        return None
+    metrics.record("http.HEAD", (time.perf_counter() - started) * 1000, items=len(response.history) + 1,
+                   error=str(response.status_code) if response.status_code >= 400 else None)
+    location = {'URL': response.url, 'Coordinates': parse_coordinates(response.url)}
+    if response.status_code < 400 and response.url:
+        map_link_cache.put('MapLinks', location_link, location)
+        map_link_cache.put('MapLinks', response.url, location)
+    return location
+
+def expand_url(location_link):
+    """Follows the redirects of a shared link and returns the final URL, or None on failure."""
+    location = expand_location(location_link)
+    return location['URL'] if location else None
+
+def link_coordinates(location_link):
+    """Returns the coordinates of a link, using an already expanded short link when there is one."""
+    location_link = location_link.strip()
+    coordinates = parse_coordinates(location_link)
+    if coordinates is None:
+        cached = map_link_cache.get('MapLinks', location_link)
+        coordinates = cached['Coordinates'] if cached else None
+    return coordinates
+
+def prefetch_location(location_link):
+    """Starts expanding a link in the background so the cache is warm when the user submits it."""
+    if location_link:
+        io_executor.submit(in_current_action(expand_location), location_link)
+
+def diff_items(old_item, new_item):
+    """Returns the attributes that differ between two versions of an item; removed ones map to None."""
+    changes = {key: value for key, value in new_item.items() if old_item.get(key) != value}
+    changes.update({key: None for key in old_item if key not in new_item})
+    return changes
+
+class ItemWatcher:
+    """Polls one item for changes in the background and reports only the attributes that changed.
+
+    Each poll is a get_item projected to Version and UpdatedAt; the full item is read only
+    when that version moves. The interval doubles while nothing changes and drops back to the minimum
+    after a change or a call to observe(). The table can be any object with get_item, so the
+    watcher runs unchanged against DynamoDB Local or moto.
+    """
+
+    def __init__(self, table, item_id, on_change, min_interval=WATCH_MIN_INTERVAL, max_interval=WATCH_MAX_INTERVAL):
+        self.table = table
+        self.item_id = item_id
+        self.on_change = on_change
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.item = None
+        self._next_poll = 0.0
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def observe(self, item):
+        """Records the version of the item the screen shows, so it is not reported again; the next poll is min_interval away."""
+        with self._lock:
+            self.item = item
+            self.interval = self.min_interval
+            self._next_poll = time.monotonic() + self.interval
+        self._wake.set()
+
+    def poll_once(self):
+        """Runs a single poll and returns the changed attributes (empty when nothing changed)."""
+        response = self.table.get_item(Key={'ID': self.item_id}, ProjectionExpression="Version, UpdatedAt")
+        version = item_version(response.get('Item', {}))
+        with self._lock:
+            if self.item is not None and version == item_version(self.item):
+                self.interval = min(self.interval * 2, self.max_interval)
+                return {}
+        item = self.table.get_item(Key={'ID': self.item_id}, **projection(ITEM_ATTRIBUTES[self.table.name])).get('Item')
+        if item is None:
+            return {}
+        with self._lock:
+            changes = diff_items(self.item or {}, item)
+            self.item = item
+            self.interval = self.min_interval
+        if changes:
+            self.on_change(item, changes)
+        return changes
+
+    def run(self):
+        current_action.set(f"watch.{self.table.name}")
+        with self._lock:
+            self._next_poll = time.monotonic() + self.interval
+        while not self._stopped.is_set():
+            # observe() wakes the wait only to shorten it
+            self._wake.wait(max(self._next_poll - time.monotonic(), 0))
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            if time.monotonic() < self._next_poll:
+                continue
+            try:
+                self.poll_once()
+            except OFFLINE_ERRORS + (ClientError,) as e:
+                print(f"Error polling for changes: {e}")
+                self.interval = min(self.interval * 2, self.max_interval)
+            with self._lock:
+                self._next_poll = time.monotonic() + self.interval
+
+    def start(self):
+        threading.Thread(target=self.run, name="sts-watch", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+def decode_number(text):
+    return int(text) if text.lstrip('-').isdigit() else Decimal(text)
+
+def decode_attribute(value):
+    """Decodes one attribute of a low-level response: like TypeDeserializer, but whole numbers
+    come back as int, sets as frozenset, lists as tuple and maps read-only."""
+    (kind, data), = value.items()
+    if kind == 'S':
+        return data
+    if kind == 'N':
+        return decode_number(data)
+    if kind == 'SS' or kind == 'BS':
+        return frozenset(data)
+    if kind == 'NS':
+        return frozenset(decode_number(number) for number in data)
+    if kind == 'BOOL' or kind == 'B':
+        return data
+    if kind == 'NULL':
+        return None
+    if kind == 'L':
+        return tuple(decode_attribute(element) for element in data)
+    if kind == 'M':
+        return MappingProxyType({key: decode_attribute(element) for key, element in data.items()})
+    raise TypeError(f"Unknown DynamoDB type {kind}")
+
+def compact_value(value):
+    """Converts a value of a resource-layer item to what decode_attribute would have returned."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else value
+    if isinstance(value, set):
+        return frozenset(compact_value(element) for element in value)
+    return value
+
+class RosterRow(Mapping):
+    """Read-only list row of a roster, with a slot per attribute instead of a dict of Decimals.
+
+    Rows read like the items they come from (row['Name'], row.get('MapLocation'), 'Status' in
+    row), so the list screens and indexes take either. Subclasses list their attributes in
+    FIELDS, the strings repeated across rows in INTERNED, and precompute in _prepare() what
+    every render of the row would otherwise work out again.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+    INTERNED = ()
+
+    @classmethod
+    def from_raw(cls, raw_item):
+        """Builds a row straight from a low-level (DynamoDB JSON) item."""
+        row = object.__new__(cls)
+        for field in cls.FIELDS:
+            value = raw_item.get(field)
+            if value is not None:
+                value = decode_attribute(value)
+                object.__setattr__(row, field, sys.intern(value) if field in cls.INTERNED else value)
+        row._prepare()
+        return row
+
+    @classmethod
+    def from_item(cls, item):
+        """Builds a row from a resource-layer item (a write, the local store)."""
+        row = object.__new__(cls)
+        for field in cls.FIELDS:
+            if field in item:
+                value = compact_value(item[field])
+                object.__setattr__(row, field, sys.intern(value) if field in cls.INTERNED else value)
+        row._prepare()
+        return row
+
+    def _prepare(self):
+        pass
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, field):
+        if field in self.FIELDS:
+            try:
+                return getattr(self, field)
+            except AttributeError:
+                pass
+        raise KeyError(field)
+
+    def __iter__(self):
+        return (field for field in self.FIELDS if hasattr(self, field))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+class EmployeeRow(RosterRow):
+    FIELDS = LIST_ATTRIBUTES['GovernmentEmployees']
+    __slots__ = FIELDS
+
+class DriverRow(RosterRow):
+    """A Drivers list row, with its button label and availability worked out once per scan."""
+
+    FIELDS = LIST_ATTRIBUTES['Drivers']
+    INTERNED = ('Status',)
+    __slots__ = FIELDS + ('label', 'available')
+
+    def _prepare(self):
+        status = self.get('Status')
+        object.__setattr__(self, 'label', f"{self.get('Name', '')} - Status: {status}")
+        object.__setattr__(self, 'available', status == 'Disponível')
+
+class RosterScan:
+    """One pass over a table's list rows, filled a page at a time; scanned_at is when it started (ms since the epoch)."""
+
+    def __init__(self, fallback=()):
+        self.rows = []
+        self.by_id = {}
+        self.scanned_at = now_ms()
+        self.started = time.monotonic()
+        self.last_key = None
+        self.complete = False
+        # Rows of the previous pass, listed instead of the rest of this one while DynamoDB is unreachable
+        self.fallback = fallback
+        self.fetch = None
+
+class RosterSnapshot:
+    """Process-wide list rows of a table, read page by page into passes every session listing it shares."""
+
+    def __init__(self, table, row_type, total_segments=1, page_size=LIST_PAGE_SIZE, max_age=ROSTER_MAX_AGE):
+        self.table = table
+        self.table_name = table.name
+        self.total_segments = total_segments
+        self.row_type = row_type
+        self.attributes = row_type.FIELDS
+        self.page_size = page_size
+        self.max_age = max_age
+        # Called with the rows of every page read, online or not
+        self.on_rows = None
+        self._scan = None
+        self._lock = threading.Lock()
+
+    def current(self, max_age=None):
+        """Returns the pass to list from: the running one while it is fresh, otherwise a new one."""
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            scan = self._scan
+            if scan is None or time.monotonic() - scan.started > max_age:
+                fallback = () if scan is None else tuple(scan.rows) or scan.fallback
+                scan = self._scan = RosterScan(fallback)
+            return scan
+
+    def rows(self, scan, start, count=None):
+        """Returns up to count rows of the pass from position start (without count, all of them), reading what is missing."""
+        while True:
+            with self._lock:
+                if scan.complete:
+                    return scan.rows[start:] if count is None else scan.rows[start:start + count]
+                if count is not None and len(scan.rows) >= start + count:
+                    return scan.rows[start:start + count]
+                fetch = scan.fetch
+                leader = fetch is None
+                if leader:
+                    fetch = scan.fetch = Future()
+            if not leader:
+                fetch.result()
+                continue
+            try:
+                rows, last_key = self._read_page(scan) if count is not None else self._read_rest(scan)
+            except BaseException as e:
+                with self._lock:
+                    scan.fetch = None
+                fetch.set_exception(e)
+                raise
+            with self._lock:
+                scan.rows.extend(rows)
+                scan.by_id.update((row['ID'], row) for row in rows)
+                scan.last_key = last_key
+                scan.complete = last_key is None
+                if scan.complete:
+                    scan.fallback = ()
+                scan.fetch = None
+            if self.on_rows is not None:
+                self.on_rows(rows)
+            fetch.set_result(None)
+
+    def _read_page(self, scan):
+        params = dict(projection(self.attributes), TableName=self.table_name, Limit=self.page_size)
+        if scan.last_key:
+            params['ExclusiveStartKey'] = scan.last_key
+        try:
+            response = dynamodb.client.scan(**params)
+        except OFFLINE_ERRORS as e:
+            return self._read_offline(scan, e), None
+        return [self.row_type.from_raw(raw_item) for raw_item in response.get('Items', [])], response.get('LastEvaluatedKey')
+
+    def read_all(self):
+        """Reads every row of the table with a full, segmented scan, outside any pass."""
+        return scan_table(self.table, self.total_segments, decode=self.row_type.from_raw, **projection(self.attributes))
+
+    def _read_rest(self, scan):
+        try:
+            rows = self.read_all()
+        except OFFLINE_ERRORS as e:
+            return self._read_offline(scan, e), None
+        return [row for row in rows if row['ID'] not in scan.by_id], None
+
+    def _read_offline(self, scan, error):
+        print(f"Offline, listing {self.table_name} from the {'last listing' if scan.fallback else 'local store'}: {error}")
+        rows = scan.fallback or [self.row_type.from_item(item) for item in local_store.items(self.table_name)]
+        return [row for row in rows if row['ID'] not in scan.by_id]
+
+class RosterOverlay:
+    """A session's own writes to roster rows, shown on top of the shared pages until a later pass has them."""
+
+    def __init__(self):
+        self._writes = {}
+        self._lock = threading.Lock()
+
+    def put(self, table_name, item):
+        with self._lock:
+            self._writes[(table_name, item['ID'])] = (now_ms(), item)
+
+    def writes(self, table_name, scanned_at):
+        """Returns this session's writes to the table by ID, dropping those a pass started at scanned_at already has."""
+        with self._lock:
+            for key in [key for key, (written_at, _) in self._writes.items() if key[0] == table_name and written_at < scanned_at]:
+                del self._writes[key]
+            return {key[1]: item for key, (_, item) in self._writes.items() if key[0] == table_name}
+
+class RosterPager:
+    """Hands out a roster one page at a time, with the session's own writes, for lists that fill up as the user scrolls."""
+
+    def __init__(self, roster, overlay, page_size=LIST_PAGE_SIZE):
+        self.roster = roster
+        self.overlay = overlay
+        self.table_name = roster.table_name
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._scan = None
+            self._position = 0
+            self.exhausted = False
+
+    def next_page(self, all_pages=False):
+        """Returns the next page, or with all_pages every remaining row."""
+        with self._lock:
+            if self.exhausted:
+                return []
+            if self._scan is None:
+                self._scan = self.roster.current()
+            scan = self._scan
+            rows = self.roster.rows(scan, self._position, None if all_pages else self.page_size)
+            self._position += len(rows)
+            self.exhausted = scan.complete and self._position >= len(scan.rows)
+            writes = self.overlay.writes(self.table_name, scan.scanned_at)
+            if not writes:
+                return rows
+            row_type = self.roster.row_type
+            rows = [row_type.from_item(writes[row['ID']]) if row['ID'] in writes else row for row in rows]
+            if self.exhausted:
+                rows.extend(row_type.from_item(item) for item_id, item in writes.items() if item_id not in scan.by_id)
+            return rows
+
+rosters = {
+    'GovernmentEmployees': RosterSnapshot(gov_employees_table, EmployeeRow),
+    'Drivers': RosterSnapshot(drivers_table, DriverRow, DRIVER_SCAN_SEGMENTS),
+}
+
+class NameIndex:
+    """Sorted index of the words in each loaded item's Name, for incremental search without another scan."""
+
+    def __init__(self):
+        self.items = {}
+        self._words = []
+        self._lock = threading.Lock()
+
+    def add_items(self, items):
+        with self._lock:
+            renamed = set()
+            for item in items:
+                previous = self.items.get(item['ID'])
+                self.items[item['ID']] = item
+                if previous is not None:
+                    if previous['Name'] == item['Name']:
+                        continue
+                    renamed.add(item['ID'])
+                self._words.extend((word, item['ID']) for word in set(item['Name'].lower().split()))
+            if renamed:
+                self._words = [entry for entry in self._words if entry[1] not in renamed]
+                for item_id in renamed:
+                    self._words.extend((word, item_id) for word in set(self.items[item_id]['Name'].lower().split()))
+            self._words.sort(key=lambda entry: entry[0])
+
+    def search(self, query, limit=LIST_PAGE_SIZE):
+        """Returns loaded items whose name has a word starting with every word of the query."""
+        query_words = query.lower().split()
+        if not query_words:
+            return []
+        first_word = query_words[0]
+        with self._lock:
+            start = bisect.bisect_left(self._words, first_word, key=lambda entry: entry[0])
+            candidate_ids = []
+            for word, item_id in self._words[start:]:
+                if not word.startswith(first_word):
+                    break
+                candidate_ids.append(item_id)
+
+            matches = []
+            for item_id in dict.fromkeys(candidate_ids):
+                item = self.items[item_id]
+                name_words = item['Name'].lower().split()
+                if all(any(word.startswith(query_word) for word in name_words) for query_word in query_words[1:]):
+                    matches.append(item)
+        matches.sort(key=lambda item: item['Name'])
+        return matches[:limit]
+
+def haversine_km(origin, destination):
+    """Great-circle distance in kilometres between two (latitude, longitude) pairs."""
+    lat1, lng1 = math.radians(origin[0]), math.radians(origin[1])
+    lat2, lng2 = math.radians(destination[0]), math.radians(destination[1])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:  # pickup distances fall back to the pure-Python haversine
+        return None
+    return numpy
+
+def haversine_km_many(origin, destinations):
+    """Distances in kilometres from origin to each (latitude, longitude) in destinations, in one vectorized pass."""
+    np = load_numpy()
+    if np is None:
+        return [haversine_km(origin, destination) for destination in destinations]
+    if not destinations:
+        return []
+    lat1, lng1 = np.radians(origin[0]), np.radians(origin[1])
+    points = np.radians(np.asarray(destinations, dtype=float))
+    lat2, lng2 = points[:, 0], points[:, 1]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))).tolist()
+
+def pickup_distances(origin, locations):
+    """Returns {key: distance_km} from origin to every location in {key: (latitude, longitude)}."""
+    keys = list(locations)
+    return dict(zip(keys, haversine_km_many(origin, [locations[key] for key in keys])))
+
+def greedy_pickup_order(origin, locations):
+    """Suggests a pickup order by always driving to the closest remaining location (nearest neighbour)."""
+    remaining = dict(locations)
+    order = []
+    position = origin
+    while remaining:
+        distances = pickup_distances(position, remaining)
+        closest = min(distances, key=distances.get)
+        order.append(closest)
+        position = remaining.pop(closest)
+    return order
+
+class LocationIndex:
+    """Grid of coordinate buckets over the loaded items, updated in place as their locations change.
+
+    A k-nearest query only visits the rings of cells around the origin until nothing
+    outside them can be closer, so its cost follows the local density, not the fleet size.
+    """
+
+    def __init__(self, cell_degrees=LOCATION_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        self.positions = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, coordinates):
+        return (math.floor(coordinates[0] / self.cell_degrees), math.floor(coordinates[1] / self.cell_degrees))
+
+    def update(self, item_id, coordinates):
+        """Moves an item to new coordinates, or drops it when they are None; unchanged positions cost nothing."""
+        with self._lock:
+            previous = self.positions.get(item_id)
+            if previous == coordinates:
+                return
+            if previous is not None:
+                cell_key = self._cell(previous)
+                del self.cells[cell_key][item_id]
+                if not self.cells[cell_key]:
+                    del self.cells[cell_key]
+                del self.positions[item_id]
+            if coordinates is not None:
+                self.positions[item_id] = coordinates
+                self.cells.setdefault(self._cell(coordinates), {})[item_id] = coordinates
+
+    def update_items(self, items, attribute='MapLocation'):
+        coordinates = parse_coordinates_batch(items, attribute)
+        for item in items:
+            position = coordinates.get(item['ID'])
+            if position is None and item.get(attribute):
+                position = link_coordinates(item[attribute])
+            self.update(item['ID'], position)
+
+    def distance_km(self, item_id, origin):
+        position = self.positions.get(item_id)
+        return haversine_km(origin, position) if position is not None else None
+
+    def nearest(self, origin, k=NEAREST_DRIVERS, accept=None):
+        """Returns up to k (distance_km, item_id) pairs closest to origin, nearest first, skipping IDs accept() rejects."""
+        with self._lock:
+            best = []
+            center_row, center_col = self._cell(origin)
+            # Every cell outside ring r is at least r cells away; the longitude side of a cell is the shorter one
+            ring_km = math.radians(self.cell_degrees) * EARTH_RADIUS_KM * max(math.cos(math.radians(origin[0])), 0.01)
+            visited = 0
+            radius = 0
+            while visited < len(self.positions):
+                if 8 * radius > len(self.cells):
+                    # Sparser than the ring being searched: checking every remaining cell is cheaper
+                    ring = [cell_key for cell_key in self.cells
+                            if max(abs(cell_key[0] - center_row), abs(cell_key[1] - center_col)) >= radius]
+                else:
+                    ring = [(center_row + row, center_col + col)
+                            for row in range(-radius, radius + 1)
+                            for col in range(-radius, radius + 1)
+                            if max(abs(row), abs(col)) == radius]
+                for cell_key in ring:
+                    for item_id, position in self.cells.get(cell_key, {}).items():
+                        visited += 1
+                        if accept is not None and not accept(item_id):
+                            continue
+                        entry = (-haversine_km(origin, position), item_id)
+                        if len(best) < k:
+                            heapq.heappush(best, entry)
+                        elif entry > best[0]:
+                            heapq.heapreplace(best, entry)
+                if 8 * radius > len(self.cells):
+                    break
+                if len(best) == k and -best[0][0] <= radius * ring_km:
+                    break
+                radius += 1
+        return sorted((-distance, item_id) for distance, item_id in best)
+
+class RosterLocations:
+    """Process-wide LocationIndex over every row of a roster, kept current by the pages its passes read."""
+
+    def __init__(self, roster, max_age=LOCATION_INDEX_MAX_AGE):
+        self.roster = roster
+        self.max_age = max_age
+        self.index = LocationIndex()
+        self.rows = {}
+        self._loaded_at = None
+        self._flight = None
+        self._lock = threading.Lock()
+        roster.on_rows = self.update
+
+    def load(self, max_age=None):
+        """Returns the index, reading the whole roster into it first when that is older than max_age (single flight)."""
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at <= max_age:
+                return self.index
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = Future()
+        if leader:
+            try:
+                self.update(self.roster.read_all(), complete=True)
+                with self._lock:
+                    self._loaded_at = time.monotonic()
+                flight.set_result(None)
+            except OFFLINE_ERRORS as e:
+                print(f"Offline, locating {self.roster.table_name} from the rows listed so far: {e}")
+                flight.set_result(None)
+            except BaseException as e:
+                flight.set_exception(e)
+            finally:
+                with self._lock:
+                    self._flight = None
+        flight.result()
+        return self.index
+
+    def update(self, rows, complete=False):
+        """Takes newer rows; with complete they are the whole roster, and IDs missing from it are dropped."""
+        with self._lock:
+            if complete:
+                current_ids = {row['ID'] for row in rows}
+                for item_id in [item_id for item_id in self.rows if item_id not in current_ids]:
+                    del self.rows[item_id]
+                    self.index.update(item_id, None)
+            self.rows.update((row['ID'], row) for row in rows)
+        self.index.update_items(rows)
+
+driver_locations = RosterLocations(rosters['Drivers'])
+
+def check_credentials(table, user_id, user_password):
+    """Returns the account, without its password, when the password matches.
+
+    This is the only read that includes Password. Accounts that sign in are remembered
+    on the device as a salted hash, so they can sign in again while offline.
+    """
+    try:
+        user_data = tables[table].get_item(Key={'ID': user_id}).get('Item')
+    except OFFLINE_ERRORS as e:
+        print(f"Offline, checking credentials against the local store: {e}")
+        return local_store.get_item(table, user_id) if local_store.check_password(table, user_id, user_password) else None
+    except ClientError as e:
+        print(f"Error checking credentials: {e}")
+        return None
+    if not user_data or user_data['Password'] != user_password:
+        return None
+    user_data = project_item(user_data, ITEM_ATTRIBUTES[table])
+    item_cache.put(table, user_id, user_data)
+    local_store.put_item(table, user_data)
+    local_store.set_password(table, user_id, user_password)
+    return user_data
+
+class KeyedControls:
+    """Keeps one control per key inside a Column, so a re-render adds, patches or removes only what changed."""
+
+    def __init__(self, column, build_control, update_control=None):
+        self.column = column
+        self.build_control = build_control
+        self.update_control = update_control
+        self.controls = {}
+
+    def put(self, key, value=None):
+        control = self.controls.get(key)
+        if control is None:
+            control = self.build_control(key, value)
+            self.controls[key] = control
+            self.column.controls.append(control)
+        elif self.update_control:
+            self.update_control(control, value)
+
+    def remove(self, key):
+        control = self.controls.pop(key, None)
+        if control is not None:
+            self.column.controls.remove(control)
+
+    def retain(self, keys):
+        for key in [key for key in self.controls if key not in keys]:
+            self.remove(key)
+
+    def sync(self, values_by_key):
+        self.retain(values_by_key)
+        for key, value in values_by_key.items():
+            self.put(key, value)
+
+    def order(self, sort_key):
+        """Reorders the keyed controls by sort_key(key), after any controls the column holds that have no key."""
+        keyed = {id(control) for control in self.controls.values()}
+        unkeyed = [control for control in self.column.controls if id(control) not in keyed]
+        self.column.controls[:] = unkeyed + [self.controls[key] for key in sorted(self.controls, key=sort_key)]
+
+class MapPreview:
+    """The session's one map: a light card with a link's coordinates, plus a WebView that is only
+    created when the user taps it, and then re-pointed instead of rebuilt.
+
+    Pointing at the URL already shown does nothing, so patches and "Atualizar" never reload
+    Google Maps for nothing.
+    """
+
+    def __init__(self, page, width=600):
+        self.page = page
+        self.width = width
+        self.height = 400
+        self.url = None
+        self.webview = None
+        self.title_text = ft.Text(weight="bold")
+        self.coordinates_text = ft.Text()
+        self.load_button = ft.ElevatedButton("Carregar mapa", on_click=lambda e: self.load())
+        self.card = ft.Card(content=ft.Container(
+            content=ft.Column(controls=[self.title_text, self.coordinates_text, self.load_button]),
+            padding=15,
+            width=width
+        ))
+        self.control = ft.Column(controls=[self.card])
+
+    def mount(self, height=400):
+        """Returns the map for a newly built screen, back on the preview card until the next tap."""
+        self.height = height
+        if self.webview is not None:
+            self.webview.visible = False
+            self.webview.height = height
+        self.load_button.visible = True
+        return self.control
+
+    def point(self, url, title=""):
+        url = url or DEFAULT_MAP_URL
+        coordinates = link_coordinates(url)
+        self.title_text.value = title
+        self.title_text.visible = bool(title)
+        self.coordinates_text.value = f"Coordenadas: {coordinates[0]}, {coordinates[1]}" if coordinates else "Coordenadas indisponíveis"
+        if url != self.url:
+            self.url = url
+            if self.webview is not None and self.webview.visible:
+                self.webview.url = url
+
+    def load(self):
+        if self.webview is None:
+            self.webview = ft.WebView(self.url, width=self.width, height=self.height)
+            self.control.controls.append(self.webview)
+        elif self.webview.url != self.url:
+            self.webview.url = self.url
+        self.webview.visible = True
+        self.load_button.visible = False
+        self.page.update()
+
+def freeze_item(item):
+    """Returns a read-only copy of an item, safe to hand to any thread."""
+    return item if item is None or isinstance(item, MappingProxyType) else MappingProxyType(dict(item))
+
+def item_version(item):
+    return (item.get('Version', 0), item.get('UpdatedAt', 0))
+
+class SessionState:
+    """Everything one user session keeps between screens. Only a SessionStore writes to it."""
+
+    __slots__ = ('table_name', 'user', 'coordinates', 'navigation_token', 'busy_tasks', 'current_view', 'watcher',
+                 'roster_overlay')
+
+    def __init__(self):
+        self.table_name = None  # table of the signed-in account, 'GovernmentEmployees' or 'Drivers'
+        self.user = None  # read-only item of the signed-in account
+        self.coordinates = ""  # last coordinates generated on a map screen
+        self.navigation_token = 0
+        self.busy_tasks = 0
+        self.current_view = None
+        self.watcher = None
+        self.roster_overlay = RosterOverlay()
+
+class SessionStore:
+    """Owns a session's SessionState: changes go through its methods, under one lock, and the
+    screens that subscribed to a field are told its new value once the lock is released.
+
+    Background threads (I/O pool, change watcher) can therefore update the session without
+    racing the UI, and each session's memory is one SessionState plus what its screen shows.
+    """
+
+    def __init__(self):
+        self.state = SessionState()
+        self._lock = threading.RLock()
+        self._subscribers = {}
+        live_sessions.add(self)
+
+    def subscribe(self, field, callback):
+        """Calls callback(value) after every change of the field; returns a function that unsubscribes."""
+        with self._lock:
+            self._subscribers.setdefault(field, []).append(callback)
+        return lambda: self._unsubscribe(field, callback)
+
+    def _unsubscribe(self, field, callback):
+        with self._lock:
+            if callback in self._subscribers.get(field, []):
+                self._subscribers[field].remove(callback)
+
+    def update(self, **changes):
+        with self._lock:
+            callbacks = self._apply(changes)
+        self._notify(callbacks)
+
+    def _apply(self, changes):
+        changed = {field: value for field, value in changes.items() if getattr(self.state, field) != value}
+        for field, value in changed.items():
+            setattr(self.state, field, value)
+        return [(callback, value) for field, value in changed.items() for callback in self._subscribers.get(field, [])]
+
+    @staticmethod
+    def _notify(callbacks):
+        for callback, value in callbacks:
+            callback(value)
+
+    def sign_in(self, table_name, user):
+        self.update(table_name=table_name, user=freeze_item(user), coordinates="")
+
+    def sign_out(self):
+        self.update(table_name=None, user=None, coordinates="")
+
+    def set_user(self, user):
+        """Replaces the signed-in account's item, unless the one already held is newer."""
+        with self._lock:
+            current = self.state.user
+            if user is None or current is None or current['ID'] != user['ID'] or item_version(user) < item_version(current):
+                return
+            callbacks = self._apply({'user': freeze_item(user)})
+        self._notify(callbacks)
+
+    def watch(self, table, item, make_watcher):
+        """Points the session's one change watcher at an item, replacing it with make_watcher() for any other item."""
+        with self._lock:
+            watcher = self.state.watcher
+            if watcher is not None and watcher.table is table and watcher.item_id == item['ID']:
+                watcher.observe(item)
+                return
+            if watcher is not None:
+                watcher.stop()
+            watcher = make_watcher()
+            watcher.observe(item)
+            watcher.start()
+            callbacks = self._apply({'watcher': watcher})
+        self._notify(callbacks)
+
+    def stop_watching(self):
+        with self._lock:
+            watcher = self.state.watcher
+            if watcher is None:
+                return
+            watcher.stop()
+            callbacks = self._apply({'watcher': None})
+        self._notify(callbacks)
+
+    def record_write(self, table_name, item):
+        """Shows an item this session wrote in the lists until a later roster pass has it."""
+        with self._lock:
+            self.state.roster_overlay.put(table_name, item)
+
+    def next_navigation(self):
+        """Marks a new navigation and returns its token; results still in flight for earlier ones are dropped."""
+        with self._lock:
+            self.state.navigation_token += 1
+            return self.state.navigation_token
+
+    def add_busy(self, delta):
+        with self._lock:
+            self.state.busy_tasks += delta
+            return self.state.busy_tasks
+
+# Stores of the sessions currently open in this process, for the debug panel
+live_sessions = weakref.WeakSet()
+
 def build_login_screen(title, id_text_field, password_text_field, switch_text, switch_callback, login_callback):
     return ft.Column(
         controls=[
@@ -105,6 +2164,9 @@ def main(page: ft.Page):
     page.vertical_alignment = ft.MainAxisAlignment.CENTER
     page.padding = ft.padding.Padding(left=10, top=50, right=10, bottom=10)
 
+    map_view = MapPreview(page)
+    store = SessionStore()
+
     gov_employee_id = ft.TextField(label="ID", width=250)
     gov_employee_password = ft.TextField(label="Senha", password=True, width=250)
 
@@ -113,24 +2175,190 @@ def main(page: ft.Page):
 
     logout_button = ft.ElevatedButton("Sair", on_click=lambda e: show_employee_login(None))
 
-    def login_employee(e):
-        user_data = check_credentials('GovernmentEmployees', int(gov_employee_id.value), gov_employee_password.value)
-        if user_data:
-            show_drivers_list(user_data)
-        else:
-            page.controls[0].controls[4].value = "User not found. Try valid credentials."
+    def show_metrics_panel(e):
+        """Debug panel with the calls made so far by this process, per action and operation."""
+        columns = ("Ação", "Operação", "Chamadas", "Erros", "p50 ms", "p95 ms", "Itens", "KB", "RCU", "WCU")
+        rows = [
+            ft.DataRow(cells=[ft.DataCell(ft.Text(value)) for value in (
+                stats['action'], stats['operation'], str(stats['calls']), str(stats['errors']),
+                f"{stats['p50_ms']:.1f}", f"{stats['p95_ms']:.1f}", str(stats['items']),
+                f"{stats['bytes'] / 1024:.1f}", f"{stats['read_units']:g}", f"{stats['write_units']:g}"
+            )])
+            for stats in metrics.snapshot()
+        ]
+
+        def export_metrics(e):
+            paths = metrics.dump(os.path.dirname(os.path.abspath(LOCAL_STORE_PATH)))
+            page.overlay.append(ft.SnackBar(ft.Text(f"Métricas salvas em {', '.join(paths)}"), open=True))
             page.update()
 
+        def reset_metrics(e):
+            metrics.reset()
+            page.close(panel)
+
+        panel = ft.AlertDialog(
+            title=ft.Text(f"Métricas ({len(live_sessions)} sessões abertas)"),
+            content=ft.Column(
+                controls=[ft.Row(controls=[ft.DataTable(columns=[ft.DataColumn(ft.Text(c)) for c in columns], rows=rows)], scroll="auto")],
+                scroll="auto",
+                height=500
+            ),
+            actions=[
+                ft.TextButton("Exportar", on_click=export_metrics),
+                ft.TextButton("Zerar", on_click=reset_metrics),
+                ft.TextButton("Fechar", on_click=lambda e: page.close(panel))
+            ]
+        )
+        page.open(panel)
+
+    if DEBUG_PANEL:
+        page.floating_action_button = ft.FloatingActionButton(icon=ft.icons.QUERY_STATS, on_click=show_metrics_panel)
+
+    def begin_navigation():
+        return store.next_navigation()
+
+    def is_current(token):
+        return token == store.state.navigation_token
+
+    def clear_view():
+        """Clears the page for a screen that is about to be built from scratch."""
+        store.update(current_view=None)
+        store.stop_watching()
+        page.controls.clear()
+
+    def set_view(name, key, refresh):
+        """Registers the screen on the page so a later render of the same screen patches it in place."""
+        store.update(current_view=(name, key, refresh))
+
+    def watch_item(table_name, item, on_change):
+        """Points the session's change watcher at the item shown on screen."""
+        def on_item_change(changed_item, changes):
+            item_cache.put(table_name, changed_item['ID'], changed_item)
+            local_store.put_item(table_name, changed_item)
+            on_change(changed_item, changes)
+
+        store.watch(tables[table_name], item, lambda: ItemWatcher(tables[table_name], item['ID'], on_item_change))
+
+    def end_session(e):
+        store.stop_watching()
+        store.sign_out()
+
+    page.on_disconnect = end_session
+
+    def patch_view(name, key, *args):
+        current_view = store.state.current_view
+        if current_view is None or current_view[:2] != (name, key):
+            return False
+        current_view[2](*args)
+        page.update()
+        return True
+
+    def lazy_pages(pager, add_page):
+        """Returns load_more(all_pages=False), which reads the next page, or every remaining one, in the background."""
+        loading = False
+        wants_all = False
+
+        @in_current_action
+        def load_more(all_pages=False):
+            nonlocal loading, wants_all
+            wants_all = wants_all or all_pages
+            if loading or pager.exhausted:
+                return
+            loading = True
+
+            def work():
+                nonlocal loading
+                items = []
+                try:
+                    items.extend(pager.next_page())
+                    if wants_all and not pager.exhausted:
+                        items.extend(pager.next_page(all_pages=True))
+                except ClientError as e:
+                    print(f"Error fetching list page: {e}")
+                finally:
+                    loading = False
+                return items
+
+            def on_loaded(items):
+                add_page(items)
+                page.update()
+
+            run_io(work, on_loaded, navigation=False)
+
+        return load_more
+
+    def scrolled_near_end(e):
+        return e.pixels >= e.max_scroll_extent - LIST_PREFETCH_PIXELS
+
+    def on_user_changed(user):
+        # A newer copy of the signed-in driver (watcher, another screen) reaches the dashboard if it is showing
+        if user is not None and store.state.table_name == 'Drivers':
+            patch_view('driver_dashboard', user['ID'], user, None, True)
+
+    store.subscribe('user', on_user_changed)
+
+    def set_busy(delta):
+        page.splash = ft.ProgressBar() if store.add_busy(delta) else None
+        page.update()
+
+    def run_io(work, on_done=None, navigation=True):
+        """Runs blocking work on the I/O pool, showing a progress bar, then passes its result to on_done.
+
+        on_done is skipped when a later navigation has superseded this one, so a slow
+        load never repaints over the screen the user has moved on to. Both run under the
+        caller's action, and their times are recorded as screen.work and screen.render.
+        """
+        token = begin_navigation() if navigation else store.state.navigation_token
+        set_busy(1)
+
+        def task():
+            try:
+                started = time.perf_counter()
+                result = work()
+                metrics.record("screen.work", (time.perf_counter() - started) * 1000)
+                if on_done and is_current(token):
+                    started = time.perf_counter()
+                    on_done(result)
+                    metrics.record("screen.render", (time.perf_counter() - started) * 1000)
+            except Exception as e:
+                print(f"Error in background task: {e}")
+            finally:
+                set_busy(-1)
+
+        io_executor.submit(in_current_action(task))
+        return token
+
+    @traced_action
+    def login_employee(e):
+        def on_checked(user_data):
+            if user_data:
+                store.sign_in('GovernmentEmployees', user_data)
+                show_drivers_list(store.state.user)
+            else:
+                page.controls[0].controls[4].value = "User not found. Try valid credentials."
+                page.update()
+
+        employee_id = int(gov_employee_id.value)
+        run_io(lambda: check_credentials('GovernmentEmployees', employee_id, gov_employee_password.value), on_checked)
+
+    @traced_action
     def login_driver(e):
-        user_data = check_credentials('Drivers', int(driver_id.value), driver_password.value)
-        if user_data:
-            show_driver_dashboard(user_data)
-        else:
-            page.controls[0].controls[4].value = "User not found. Try valid credentials."
-            page.update()
+        def on_checked(user_data):
+            if user_data:
+                store.sign_in('Drivers', user_data)
+                show_driver_dashboard(store.state.user)
+            else:
+                page.controls[0].controls[4].value = "User not found. Try valid credentials."
+                page.update()
 
+        user_id = int(driver_id.value)
+        run_io(lambda: check_credentials('Drivers', user_id, driver_password.value), on_checked)
+
+    @traced_action
     def show_employee_login(e):
-        page.controls.clear()
+        begin_navigation()
+        clear_view()
+        store.sign_out()
         page.vertical_alignment = "start"
         page.controls.append(
             build_login_screen(
@@ -140,8 +2368,11 @@ def main(page: ft.Page):
         )
         page.update()
 
+    @traced_action
     def show_driver_login(e):
-        page.controls.clear()
+        begin_navigation()
+        clear_view()
+        store.sign_out()
         page.vertical_alignment = "start"
         page.controls.append(
             build_login_screen(
@@ -151,48 +2382,105 @@ def main(page: ft.Page):
         )
         page.update()
 
+    @traced_action
     def show_drivers_list(employee_data):
-        page.controls.clear()
+        run_io(lambda: get_employee_rides(employee_data['ID']), lambda employee_rides: render_drivers_list(employee_data, employee_rides))
+
+    def render_drivers_list(employee_data, employee_rides):
+        if patch_view('drivers_list', employee_data['ID'], employee_data, employee_rides):
+            return
+
+        clear_view()
         page.scroll = "auto"
         page.vertical_alignment = "start"
         page.controls.append(
             ft.Row(
                 controls=[ft.Container(content=logout_button, alignment=ft.alignment.top_left),
-                          ft.Container(content=ft.ElevatedButton("Atualizar", on_click=lambda e: show_drivers_list(employee_data)), alignment=ft.alignment.top_left)],  
+                          ft.Container(content=ft.ElevatedButton("Atualizar", on_click=lambda e: show_drivers_list(list_employee)), alignment=ft.alignment.top_left)],  
                 alignment=ft.MainAxisAlignment.START
             )
         )
-               
-        driver_list_controls = [ft.Text("Lista de Motoristas", size=24, weight="bold")]
-
-        try:
-            response = drivers_table.scan()
-            drivers = response['Items']
-            for driver in drivers:
-                if employee_data['Name'] in driver.get('RideRequests', []) or employee_data['Name'] in driver.get('Passengers', []):
-                    continue  
-                
-                button = ft.TextButton(
-                    f"{driver['Name']} - Status: {driver['Status']}",
-                    on_click=lambda e, d_id=driver['ID']: show_driver_details(d_id, employee_data)
-                )
-                driver_list_controls.append(button)
-        except ClientError as e:
-            print(f"Error fetching drivers: {e}")
 
-        show_cancel_button = any(employee_data['Name'] in driver.get('RideRequests', []) for driver in drivers)
-        if show_cancel_button:
-            driver_list_controls.append(
-                ft.TextButton("Cancelar Solicitação de Motorista", on_click=lambda e: cancel_ride_request(employee_data))
+        list_employee = employee_data
+        employee_location = None
+        held_driver_ids = set()
+        seen_driver_ids = set()
+        pager = RosterPager(rosters['Drivers'], store.state.roster_overlay)
+        name_index = NameIndex()
+        location_index = driver_locations.index
+        load_more = None
+
+        def driver_label(driver):
+            distance = location_index.distance_km(driver['ID'], employee_location) if employee_location else None
+            return driver.label if distance is None else f"{driver.label} - {distance:.1f} km"
+
+        def driver_row(d_id):
+            # Rows not listed yet come from the whole-roster location index
+            return name_index.items.get(d_id) or driver_locations.rows[d_id]
+
+        def driver_sort_key(d_id):
+            # Available drivers first, then the closest to the employee; drivers without a location go last
+            driver = name_index.items[d_id]
+            distance = location_index.distance_km(d_id, employee_location) if employee_location else None
+            return (not driver.available, distance is None, distance or 0, driver['Name'])
+
+        def is_available(d_id):
+            return d_id not in held_driver_ids and driver_row(d_id).available
+
+        def build_driver_row(d_id, driver):
+            return ft.TextButton(
+                driver_label(driver),
+                on_click=lambda e: show_driver_details(d_id, list_employee)
             )
 
+        def update_driver_row(button, driver):
+            button.text = driver_label(driver)
+
+        def on_list_scroll(e):
+            if scrolled_near_end(e):
+                load_more()
+
+        driver_buttons = ft.ListView(height=400, item_extent=LIST_ROW_HEIGHT, on_scroll=on_list_scroll)
+        driver_rows = KeyedControls(driver_buttons, build_driver_row, update_driver_row)
+        search_results = ft.ListView(height=400, item_extent=LIST_ROW_HEIGHT, visible=False)
+
+        def apply_search(fetch=True):
+            query = (search_field.value or "").strip()
+            if not query:
+                search_results.visible = False
+                driver_buttons.visible = True
+                return
+            search_results.controls = [build_driver_row(driver['ID'], driver) for driver in name_index.search(query) if driver['ID'] not in held_driver_ids]
+            search_results.visible = True
+            driver_buttons.visible = False
+            if fetch:
+                load_more(all_pages=True)
+
+        def on_search_change(e):
+            apply_search()
+            page.update()
+
+        search_field = ft.TextField(label="Buscar motorista", width=300, on_change=on_search_change)
+
+        nearest_drivers = ft.Column(horizontal_alignment=ft.CrossAxisAlignment.CENTER, visible=False)
+
+        def show_nearest_drivers():
+            nearest = location_index.nearest(employee_location, accept=is_available) if employee_location else []
+            nearest_drivers.controls = [ft.Text("Motoristas disponíveis mais próximos", weight="bold")] + [
+                build_driver_row(d_id, driver_row(d_id)) for _, d_id in nearest
+            ]
+            nearest_drivers.visible = bool(nearest)
+
+        cancel_button = ft.TextButton("Cancelar Solicitação de Motorista", on_click=lambda e: cancel_ride_request(list_employee))
+        driver_list_controls = [ft.Text("Lista de Motoristas", size=24, weight="bold"), nearest_drivers, search_field, driver_buttons, search_results, cancel_button]
+
         share_location_button = ft.ElevatedButton(
             "Compartilhar",
-            on_click=lambda e: share_location(employee_data, location_field.value)
+            on_click=lambda e: share_location(list_employee, location_field.value)
         )
-        location_field = ft.TextField(label="Inserir Link (Google Maps)", width=300)
+        location_field = ft.TextField(label="Inserir Link (Google Maps)", width=300, on_blur=lambda e: prefetch_location(e.control.value))
 
-        map_button = ft.ElevatedButton("Abrir Mapa", on_click=lambda e: show_map_employee(employee_data))
+        map_button = ft.ElevatedButton("Abrir Mapa", on_click=lambda e: show_map_employee(list_employee))
 
         geo = ft.Row(controls=[
             ft.Container(content=share_location_button),
@@ -202,9 +2490,8 @@ def main(page: ft.Page):
 
         driver_list_controls.append(location_field)
         driver_list_controls.append(geo)
-        latest_location = ft.Text(f"Última localização: {employee_data['MapLocation']}")
-        location_link = f"{employee_data['MapLocation']}"
-        copy_location_button = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(location_link))
+        latest_location = ft.Text()
+        copy_location_button = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(f"{list_employee['MapLocation']}"))
         driver_list_controls.append(latest_location)
         driver_list_controls.append(copy_location_button)
 
@@ -216,411 +2503,488 @@ def main(page: ft.Page):
             scroll= "auto",
         )
         page.controls.append(driver_list)
+
+        def add_driver_page(drivers_page):
+            name_index.add_items(drivers_page)
+            for driver in drivers_page:
+                seen_driver_ids.add(driver['ID'])
+                if driver['ID'] in held_driver_ids:
+                    driver_rows.remove(driver['ID'])
+                else:
+                    driver_rows.put(driver['ID'], driver)
+            if pager.exhausted:
+                # Rows keep the order their pages came in until the list is whole, so nothing moves under the scroll
+                driver_rows.retain(seen_driver_ids - held_driver_ids)
+                driver_rows.order(driver_sort_key)
+            show_nearest_drivers()
+            apply_search(fetch=False)
+
+        def on_locations_loaded(index):
+            for d_id, button in driver_rows.controls.items():
+                update_driver_row(button, name_index.items[d_id])
+            show_nearest_drivers()
+            page.update()
+
+        def refresh(employee_data, employee_rides):
+            nonlocal list_employee, employee_location, held_driver_ids, seen_driver_ids, load_more
+            list_employee = employee_data
+            employee_location = link_coordinates(employee_data['MapLocation']) if employee_data.get('MapLocation') else None
+            held_driver_ids = frozenset(int(ride['DriverID']) for ride in employee_rides)
+            for d_id in held_driver_ids:
+                driver_rows.remove(d_id)
+            cancel_button.visible = any(ride['State'] == 'RideRequests' for ride in employee_rides)
+            latest_location.value = f"Última localização: {employee_data['MapLocation']}"
+
+            seen_driver_ids = set()
+            pager.reset()
+            load_more = lazy_pages(pager, add_driver_page)
+            load_more()
+            run_io(driver_locations.load, on_locations_loaded, navigation=False)
+
+        set_view('drivers_list', employee_data['ID'], refresh)
+        refresh(employee_data, employee_rides)
         page.update()
 
-    gps = ""
+    def render_map_tools():
+        """Appends the link field, coordinates and map preview shared by the employee and driver map screens."""
+        location_field = ft.TextField(label="Inserir Link (Google Maps)", width=300, on_blur=lambda e: prefetch_location(e.control.value))
+        page.controls.append(location_field)
+
+        gps_coordinates = ft.Text(f"Coordenadas: {store.state.coordinates}")
+        page.controls.append(ft.Row(controls=[gps_coordinates]))
+        generate_coordinates = ft.ElevatedButton("Gerar Coordenadas", on_click=lambda e: coordinates_generator(location_field.value))
+        copy_coordinates = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(store.state.coordinates))
+        submit_button = ft.ElevatedButton("Submeter", on_click=lambda e: submit(location_field.value))
+        page.controls.append(ft.Row(controls=[submit_button, generate_coordinates, copy_coordinates], scroll="auto"))
+        map_view.point(DEFAULT_MAP_URL)
+        page.controls.append(map_view.mount(height=800))
+
+        def coordinates_generator(location_link):
+            coordinates = link_coordinates(location_link or "")
+            if coordinates is None:
+                return None
 
-    def show_map_employee(employee_data):
+            GPSLocation = f"{coordinates[0]}, {coordinates[1]}"
+            store.update(coordinates=GPSLocation)
+            gps_coordinates.value = f"Coordenadas: {GPSLocation}"
+            page.update()
+            return GPSLocation
 
-        nonlocal gps
+        def submit(location_link):
+            if location_link:
+                run_io(lambda: expand_url(location_link), point_map, navigation=False)
 
-        page.controls.clear()
+        def point_map(full_url):
+            map_view.point(full_url if full_url and "maps" in full_url else DEFAULT_MAP_URL)
+            page.update()
+
+    @traced_action
+    def show_map_employee(employee_data):
+        begin_navigation()
+        clear_view()
         page.scroll = "None"
         page.controls.append(
             ft.Row(
                 controls=[ft.Container(content=logout_button, alignment=ft.alignment.top_left),
-                          ft.Container(content=ft.ElevatedButton("Início", on_click=lambda e: show_drivers_list(employee_data)), alignment=ft.alignment.top_left),
+                          ft.Container(content=ft.ElevatedButton("Início", on_click=lambda e: show_drivers_list(store.state.user)), alignment=ft.alignment.top_left),
                           ft.Container(content=ft.ElevatedButton("Atualizar", on_click=lambda e: show_map_employee(employee_data)), alignment=ft.alignment.top_left)], 
                 alignment=ft.MainAxisAlignment.START
             )
         )
-        insert_location = ft.TextField(label="Inserir Link (Google Maps)", width=300)
-        page.controls.append(insert_location)
-
-        default_location = "https://www.google.com/maps"
-
-        gps_coordinates = ft.Text(f"Coordenadas: {gps}")
-        row = ft.Row(controls=[gps_coordinates])
-        page.controls.append(row)
-        generate_coordinates = ft.ElevatedButton("Gerar Coordenadas", on_click=lambda e: coordinates_generator(insert_location.value))
-        copy_coordinates = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(gps))
-        submit_button = ft.ElevatedButton("Submeter", on_click=lambda e: submit(insert_location.value))
-        row2 = ft.Row(controls=[submit_button,generate_coordinates,copy_coordinates], scroll="auto")
-        page.controls.append(row2)
-        webview = ft.WebView(default_location, width=600, height=800)
-        map = ft.Column(controls=[webview])
-        page.controls.append(map)
-
-        def coordinates_generator(insert_location):
-
-            nonlocal gps
-            nonlocal row
-            nonlocal gps_coordinates
-            
-            if "search/" in insert_location:
-                    coordinates_part = insert_location.split("search/")[1]
-            else:
-                return None
-            
-            if "," in coordinates_part:
-                
-                latitude = coordinates_part.split(",")[0]
-                
-                longitude = coordinates_part.split(",")[1]
-                
-                longitude = longitude.split("?")[0]
-
-            if "-" in longitude:
-                    longitude = longitude.split("+")[1]
-
-            try:
-                
-                latitude = float(latitude)
-                longitude = float(longitude)
-                GPSLocation = f"{latitude}, {longitude}"
-                gps = GPSLocation
-                row.controls.remove(gps_coordinates)
-                gps_coordinates = ft.Text(f"Coordenadas: {gps}")
-                row.controls.append(gps_coordinates)
-                page.update()
-                return GPSLocation
-                
-            except ValueError:
-
-                return None
-
-        def submit(insert_location):
-            
-            nonlocal default_location
-            nonlocal map
-            nonlocal webview
-
-            if insert_location:
-                try:
-                    response = requests.head(insert_location, allow_redirects=True)
-
-                    full_url = response.url
-        
-                    if "maps" in full_url:
-                        default_location = full_url
-                        map.controls.remove(webview)  
-                        webview = ft.WebView(default_location, width=600, height=800) 
-                        map.controls.append(webview)
-                        page.update() 
-                        return default_location
-                    else:
-                        default_location = "https://www.google.com/maps"
-                        return default_location
-            
-                except requests.RequestException as e:
-                    print(f"Error expanding URL: {e}")
-                    default_location = "https://www.google.com/maps"
-                    return default_location
-        
-        page.update()   
+        render_map_tools()
+        page.update()
         
-    def show_driver_details(driver_id, employee_data):
-        driver = get_driver_data(driver_id)
-        page.controls.clear()
+    @traced_action
+    def show_driver_details(driver_id, employee_data, force_refresh=False):
+        local_driver = None if force_refresh else peek_item('Drivers', driver_id)
+        if local_driver:
+            render_driver_details(driver_id, local_driver, employee_data)
+        run_io(lambda: get_driver_data(driver_id, force_refresh), lambda driver: render_driver_details(driver_id, driver, employee_data))
+
+    def render_driver_details(driver_id, driver, employee_data, ride_changes=None):
+        if patch_view('driver_details', driver_id, driver, ride_changes):
+            return
+
+        clear_view()
         page.scroll = "auto"
 
         page.controls.append(
             ft.Row(
                 controls=[ft.Container(content=logout_button, alignment=ft.alignment.top_left),
-                          ft.Container(content=ft.ElevatedButton("Início", on_click=lambda e: show_drivers_list(employee_data)), alignment=ft.alignment.top_left),
-                          ft.Container(content=ft.ElevatedButton("Atualizar", on_click=lambda e: show_driver_details(driver_id, employee_data)), alignment=ft.alignment.top_left)],  
+                          ft.Container(content=ft.ElevatedButton("Início", on_click=lambda e: show_drivers_list(store.state.user)), alignment=ft.alignment.top_left),
+                          ft.Container(content=ft.ElevatedButton("Atualizar", on_click=lambda e: show_driver_details(driver_id, employee_data, force_refresh=True)), alignment=ft.alignment.top_left)],  
                 alignment=ft.MainAxisAlignment.START
             )
         )
 
         employee_name = employee_data['Name']
-        send_request_text = "Enviar Solicitação de Motorista"
-        send_request_enabled = True
-
-        if employee_name in driver.get('Passengers', []):
-            send_request_text = "Aceita"
-            send_request_enabled = False
-        elif employee_name in driver.get('RideRequests', []):
-            send_request_text = "Enviada"
-            send_request_enabled = False
+        details_driver = driver
+        details_rides = None
 
+        @traced_action
         def send_ride_request(e):
-            if employee_name not in driver.get("RideRequests", []) and employee_name not in driver.get("Passengers", []):
-                update_driver_data(driver_id, "ADD RideRequests :r", {":r": {employee_name}})
-                ensure_set_attribute_exists('Drivers', driver_id, "RideRequests")
-                page.overlay.append(ft.SnackBar(ft.Text(f"Solicitação enviada para {driver['Name']}")))
-                show_driver_details(driver_id, employee_data)
+            def on_sent(result):
+                show_ride_result(result, f"Solicitação enviada para {details_driver['Name']}",
+                                 f"Você já tem uma solicitação ou corrida com {details_driver['Name']}")
+                render_driver_details(driver_id, result.driver or details_driver, employee_data, result.rides)
 
-        location_link = driver.get("MapLocation", "https://www.google.com/maps")
-        copy_location_button = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(location_link))
-        contact = driver.get("Contact","Nenhuma informação")
-        copy_contact_button = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(contact))
+            run_io(lambda: transition_ride('request', driver_id, employee_data['ID'], employee_name), on_sent)
 
+        copy_location_button = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(details_driver.get("MapLocation", DEFAULT_MAP_URL)))
+        copy_contact_button = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(details_driver.get("Contact","Nenhuma informação")))
 
-        webview = ft.WebView(location_link, width=600, height=400)
+        name_text = ft.Text()
+        status_text = ft.Text()
+        contact_text = ft.Text()
+        additional_details_text = ft.Text()
+        passengers_text = ft.Text()
+        location_text = ft.Text()
+        send_request_button = ft.ElevatedButton(on_click=send_ride_request)
 
         details = ft.Column(
             controls=[
                 ft.Text(f"Motorista:", size=20),
-                ft.Text(f"Nome: {driver['Name']}"),
-                ft.Text(f"Status: {driver['Status']}"),
-                ft.Text(f"Contato: {driver['Contact']}"),
+                name_text,
+                status_text,
+                contact_text,
                 copy_contact_button,
-                ft.Text(f"Detalhamento: {driver['AdditionalDetails']}"),
-                ft.Text(f"Passageiros: {', '.join(driver.get('Passengers', []))}"),
-                ft.Text(f"Localização: {location_link}"),
+                additional_details_text,
+                passengers_text,
+                location_text,
                 copy_location_button,
-                ft.ElevatedButton(
-                    send_request_text, 
-                    on_click=send_ride_request,
-                    disabled=not send_request_enabled
-                ),webview
+                send_request_button,
+                map_view.mount(height=400)
             ],
             alignment=ft.MainAxisAlignment.CENTER
         )
         page.controls.append(details)
+
+        def show_rides(driver, rides):
+            nonlocal details_rides
+            if details_driver is not driver:
+                return
+            details_rides = rides
+            ride_keys = {ride['RideKey'] for ride in rides}
+            passenger_names = sorted(ride['EmployeeName'] for ride in rides if ride['State'] == 'Passengers')
+            passengers_text.value = f"Passageiros: {', '.join(passenger_names)}"
+
+            if ride_key('Passengers', employee_data['ID']) in ride_keys:
+                send_request_button.text = "Aceita"
+                send_request_button.disabled = True
+            elif ride_key('RideRequests', employee_data['ID']) in ride_keys:
+                send_request_button.text = "Enviada"
+                send_request_button.disabled = True
+            else:
+                send_request_button.text = "Enviar Solicitação de Motorista"
+                send_request_button.disabled = False
+            page.update()
+
+        def refresh(driver, ride_changes=None):
+            nonlocal details_driver
+            details_driver = driver
+            location_link = driver.get("MapLocation", DEFAULT_MAP_URL)
+
+            name_text.value = f"Nome: {driver['Name']}"
+            status_text.value = f"Status: {driver['Status']}"
+            contact_text.value = f"Contato: {driver['Contact']}"
+            additional_details_text.value = f"Detalhamento: {driver['AdditionalDetails']}"
+            location_text.value = f"Localização: {location_link}"
+            if ride_changes is None or details_rides is None:
+                run_io(lambda: get_driver_rides(driver_id), lambda rides: show_rides(driver, rides), navigation=False)
+            else:
+                show_rides(driver, merge_rides(details_rides, ride_changes))
+
+            map_view.point(location_link, driver['Name'])
+
+            watch_item('Drivers', driver, lambda changed_driver, changes: patch_view('driver_details', driver_id, changed_driver))
+
+        set_view('driver_details', driver_id, refresh)
+        refresh(driver)
         page.update()
 
-    def show_driver_dashboard(driver_data):
-        page.controls.clear()
+    @traced_action
+    def show_driver_dashboard(driver_data, ride_changes=None):
+        begin_navigation()
+        if patch_view('driver_dashboard', driver_data['ID'], driver_data, ride_changes):
+            return
+
+        clear_view()
         page.scroll = "auto"
         page.controls.append(
             ft.Row(
                 controls=[ft.Container(content=logout_button, alignment=ft.alignment.top_left),
-                          ft.Container(content=ft.ElevatedButton("Atualizar", on_click=lambda e: refresh_driver_dashboard(driver_data)), alignment=ft.alignment.top_left)],  
+                          ft.Container(content=ft.ElevatedButton("Atualizar", on_click=lambda e: refresh_driver_dashboard(dashboard_driver)), alignment=ft.alignment.top_left)],  
                 alignment=ft.MainAxisAlignment.START
             )
         )
 
+        dashboard_driver = driver_data
+
         employee_list_button = ft.ElevatedButton(
             "Ver Servidores", 
-            on_click=lambda e: show_employee_list(driver_data)
+            on_click=lambda e: show_employee_list(dashboard_driver)
         )
 
-        map_button = ft.ElevatedButton("Abrir Mapa", on_click=lambda e: show_map(driver_data))
+        map_button = ft.ElevatedButton("Abrir Mapa", on_click=lambda e: show_map(dashboard_driver))
 
-        location_field = ft.TextField(label="Inserir Link (Google Maps)", width=300)
+        location_field = ft.TextField(label="Inserir Link (Google Maps)", width=300, on_blur=lambda e: prefetch_location(e.control.value))
 
         share_location_button = ft.ElevatedButton(
             "Compartilhar",
-            on_click=lambda e: share_driver_location(driver_data, location_field.value)
+            on_click=lambda e: share_driver_location(dashboard_driver, location_field.value)
         )
 
-        requests_controls = [ft.Text("Solicitações de Motorista:", size=20)]
+        no_requests_text = ft.Text("Nenhuma solicitação.")
+        requests_column = ft.Column(controls=[ft.Text("Solicitações de Motorista:", size=20), no_requests_text], alignment=ft.MainAxisAlignment.CENTER, scroll = "auto")
 
-        if "RideRequests" in driver_data and driver_data["RideRequests"]:
-            for request in driver_data["RideRequests"]:
-                accept_button = ft.ElevatedButton(
-                    f"Aceitar solicitação de {request}",
-                    on_click=lambda e, req=request: accept_ride_request(driver_data, req)
-                )
-                deny_button = ft.ElevatedButton(
-                    f"Negar solicitação de {request}",
-                    on_click=lambda e, req=request: deny_ride_request(driver_data, req)
-                )
-                requests_controls.extend([accept_button, deny_button])
-        else:
-            requests_controls.append(ft.Text("Nenhuma solicitação."))
-
-        passenger_controls = [ft.Text("Gerenciar Passageiros:", size=20)]
-        if "Passengers" in driver_data and driver_data["Passengers"]:
-            for passenger in driver_data["Passengers"]:
-                remove_button = ft.ElevatedButton(
-                    f"Remover {passenger}",
-                    on_click=lambda e, p=passenger: remove_passenger(driver_data, p)
+        def distance_label(distance):
+            return "" if distance is None else f"{distance:.1f} km até o embarque"
+
+        def build_request_entry(employee_id, ride):
+            accept_button = ft.ElevatedButton(
+                f"Aceitar solicitação de {ride['EmployeeName']}",
+                on_click=lambda e: accept_ride_request(dashboard_driver, ride)
+            )
+            deny_button = ft.ElevatedButton(
+                f"Negar solicitação de {ride['EmployeeName']}",
+                on_click=lambda e: deny_ride_request(dashboard_driver, ride)
+            )
+            return ft.Column(controls=[ft.Text(distance_label(rider_distances.get(employee_id))), accept_button, deny_button])
+
+        def update_rider_entry(entry, ride):
+            entry.controls[0].value = distance_label(rider_distances.get(ride['EmployeeID']))
+
+        request_entries = KeyedControls(requests_column, build_request_entry, update_rider_entry)
+
+        passengers_column = ft.Column(controls=[ft.Text("Gerenciar Passageiros:", size=20)], alignment=ft.MainAxisAlignment.CENTER, scroll = "auto")
+
+        def build_passenger_entry(employee_id, ride):
+            return ft.Column(controls=[
+                ft.Text(distance_label(rider_distances.get(employee_id))),
+                ft.ElevatedButton(
+                    f"Remover {ride['EmployeeName']}",
+                    on_click=lambda e: remove_passenger(dashboard_driver, ride)
                 )
-                passenger_controls.append(remove_button)
+            ])
+
+        passenger_entries = KeyedControls(passengers_column, build_passenger_entry, update_rider_entry)
+        pickup_order_text = ft.Text()
+        dashboard_rides = None
+        rider_distances = {}
 
         status_buttons = ft.Row(
             controls=[
-                ft.ElevatedButton("Mudar para Disponível", on_click=lambda e: update_driver_status(driver_data, "Disponível")),
-                ft.ElevatedButton("Mudar para Dirigindo", on_click=lambda e: update_driver_status(driver_data, "Dirigindo")),
-                ft.ElevatedButton("Mudar para Ausente", on_click=lambda e: update_driver_status(driver_data, "Ausente"))
+                ft.ElevatedButton("Mudar para Disponível", on_click=lambda e: update_driver_status(dashboard_driver, "Disponível")),
+                ft.ElevatedButton("Mudar para Dirigindo", on_click=lambda e: update_driver_status(dashboard_driver, "Dirigindo")),
+                ft.ElevatedButton("Mudar para Ausente", on_click=lambda e: update_driver_status(dashboard_driver, "Ausente"))
             ],
             scroll="auto"
         )
 
-        location_link = f"{driver_data['MapLocation']}"
+        copy_location_button = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(f"{dashboard_driver['MapLocation']}"))
 
-        copy_location_button = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(location_link))
+        status_text = ft.Text(size=20)
+        location_text = ft.Text()
+        passengers_text = ft.Text()
 
         dashboard = ft.Column(
             controls=[
                 ft.Text(f"Bem-vindo, {driver_data['Name']}!", size=20),
-                ft.Text(f"Status: {driver_data['Status']}", size=20),
+                status_text,
                 status_buttons,
-                ft.Text(f"Última localização: {driver_data['MapLocation']}"),
+                location_text,
                 copy_location_button,
                 location_field,
                 ft.Row(controls=[
                 share_location_button,
                 map_button]),
                 employee_list_button,
-                ft.Column(controls=requests_controls, alignment=ft.MainAxisAlignment.CENTER, scroll = "auto"),
+                requests_column,
                 ft.Text(f"Passageiros:", size=20),
-                ft.Text(f"{', '.join(driver_data.get('Passengers', []))}"),
-                ft.Column(controls=passenger_controls, alignment=ft.MainAxisAlignment.CENTER, scroll = "auto"),
+                passengers_text,
+                pickup_order_text,
+                passengers_column,
             ],
             alignment=ft.MainAxisAlignment.CENTER
         )
         page.controls.append(dashboard)
-        page.update()
 
-    gps2 = ""
+        def rides_in_state(state):
+            return {ride['EmployeeID']: ride for ride in dashboard_rides or [] if ride['State'] == state}
+
+        def show_rider_distances():
+            # Closest pickups first; riders whose location is unknown keep alphabetical order at the end
+            for entries, riders in ((request_entries, rides_in_state('RideRequests')), (passenger_entries, rides_in_state('Passengers'))):
+                def pickup_key(employee_id):
+                    distance = rider_distances.get(employee_id)
+                    return (distance is None, distance or 0, riders[employee_id]['EmployeeName'])
+
+                entries.sync(riders)
+                entries.order(pickup_key)
+
+        def show_rides(driver_data, rides):
+            nonlocal dashboard_rides
+            if dashboard_driver is not driver_data:
+                return
+            dashboard_rides = rides
+            ride_requests = rides_in_state('RideRequests')
+            passengers = rides_in_state('Passengers')
+
+            passengers_text.value = f"{', '.join(sorted(ride['EmployeeName'] for ride in passengers.values()))}"
+            no_requests_text.visible = not ride_requests
+            show_rider_distances()
+
+            driver_location = link_coordinates(driver_data['MapLocation']) if driver_data.get('MapLocation') else None
+            if driver_location and rides:
+                def on_located(locations):
+                    if dashboard_rides is rides:
+                        rider_distances.clear()
+                        rider_distances.update(pickup_distances(driver_location, locations))
+                        order = greedy_pickup_order(driver_location, {employee_id: locations[employee_id] for employee_id in passengers if employee_id in locations})
+                        pickup_order_text.value = f"Ordem de embarque sugerida: {' → '.join(passengers[employee_id]['EmployeeName'] for employee_id in order)}" if len(order) > 1 else ""
+                        show_rider_distances()
+                        page.update()
 
-    def show_map(driver_data):
+                run_io(lambda: get_rider_locations(rides), on_located, navigation=False)
+            else:
+                rider_distances.clear()
+                pickup_order_text.value = ""
+                show_rider_distances()
+            page.update()
+
+        def refresh(driver_data, ride_changes=None, changed_only=False):
+            nonlocal dashboard_driver
+            if driver_data.get('Version', 0) < dashboard_driver.get('Version', 0):
+                return  # a slower response carrying an older copy of the driver
+            if changed_only and driver_data == dashboard_driver:
+                return  # the session store echoing the copy already on screen
+            dashboard_driver = driver_data
+
+            status_text.value = f"Status: {driver_data['Status']}"
+            location_text.value = f"Última localização: {driver_data['MapLocation']}"
+            if ride_changes is None or dashboard_rides is None:
+                run_io(lambda: get_driver_rides(driver_data['ID']), lambda rides: show_rides(driver_data, rides), navigation=False)
+            else:
+                show_rides(driver_data, merge_rides(dashboard_rides, ride_changes))
 
-        nonlocal gps2
+            watch_item('Drivers', driver_data, lambda changed_driver, changes: store.set_user(changed_driver))
 
-        page.controls.clear()
+        set_view('driver_dashboard', driver_data['ID'], refresh)
+        refresh(driver_data)
+        page.update()
+
+    @traced_action
+    def show_map(driver_data):
+        begin_navigation()
+        clear_view()
         page.scroll = "None"
         page.controls.append(
             ft.Row(
                 controls=[ft.Container(content=logout_button, alignment=ft.alignment.top_left),
-                          ft.Container(content=ft.ElevatedButton("Início", on_click=lambda e: show_driver_dashboard(driver_data)), alignment=ft.alignment.top_left),
+                          ft.Container(content=ft.ElevatedButton("Início", on_click=lambda e: show_driver_dashboard(store.state.user)), alignment=ft.alignment.top_left),
                           ft.Container(content=ft.ElevatedButton("Atualizar", on_click=lambda e: show_map(driver_data)), alignment=ft.alignment.top_left)],  
                 alignment=ft.MainAxisAlignment.START
             )
         )
+        render_map_tools()
+        page.update()
+    
+    @traced_action
+    def show_employee_list(driver_data):
+        begin_navigation()
+        clear_view()
+        page.scroll = None
 
-        insert_location_2 = ft.TextField(label="Inserir Link (Google Maps)", width=300)
-        page.controls.append(insert_location_2)
-        
-        default_location_2 = "https://www.google.com/maps"
-
-        gps_coordinates = ft.Text(f"Coordenadas: {gps2}")
-        row = ft.Row(controls=[gps_coordinates])
-        page.controls.append(row)
-        generate_coordinates = ft.ElevatedButton("Gerar Coordenadas", on_click=lambda e: coordinates_generator(insert_location_2.value))
-        copy_coordinates = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(gps2))
-        submit_button_2 = ft.ElevatedButton("Submeter", on_click=lambda e: submit_2(insert_location_2.value))
-        row2 = ft.Row(controls=[submit_button_2,generate_coordinates,copy_coordinates],scroll="auto")
-        page.controls.append(row2)
-        webview_2 = ft.WebView(default_location_2, width=600, height=800)
-        map_2 = ft.Column(controls=[webview_2])
-        page.controls.append(map_2)
-
-        def coordinates_generator(insert_location):
-
-            nonlocal gps2
-            nonlocal row
-            nonlocal gps_coordinates
-            
-            if "search/" in insert_location:
-                    coordinates_part = insert_location.split("search/")[1]
-            else:
-                return None
-            
-            if "," in coordinates_part:
-                
-                latitude = coordinates_part.split(",")[0]
-                
-                longitude = coordinates_part.split(",")[1]
-                
-                longitude = longitude.split("?")[0]
-
-            if "-" in longitude:
-                    longitude = longitude.split("+")[1]
-
-            try:
-                
-                latitude = float(latitude)
-                longitude = float(longitude)
-                GPSLocation = f"{latitude}, {longitude}"
-                gps2 = GPSLocation
-                row.controls.remove(gps_coordinates)
-                gps_coordinates = ft.Text(f"Coordenadas: {gps2}")
-                row.controls.append(gps_coordinates)
-                page.update()
-                return GPSLocation
-                
-            except ValueError:
+        pager = RosterPager(rosters['GovernmentEmployees'], store.state.roster_overlay)
+        name_index = NameIndex()
 
-                return None
+        def build_employee_row(employee):
+            return ft.TextButton(
+                f"{employee['Name']}",
+                on_click=lambda e, emp_id=employee['ID']: show_employee_details(emp_id, driver_data)
+            )
 
-        def submit_2(insert_location_2):
-            
-            nonlocal default_location_2
-            nonlocal map_2
-            nonlocal webview_2
+        def add_employee_page(employees):
+            name_index.add_items(employees)
+            employee_rows.controls.extend(build_employee_row(employee) for employee in employees)
+            apply_search(fetch=False)
+
+        load_more = lazy_pages(pager, add_employee_page)
+
+        def on_list_scroll(e):
+            if scrolled_near_end(e):
+                load_more()
+
+        employee_rows = ft.ListView(expand=True, item_extent=LIST_ROW_HEIGHT, on_scroll=on_list_scroll)
+        search_results = ft.ListView(expand=True, item_extent=LIST_ROW_HEIGHT, visible=False)
+
+        def apply_search(fetch=True):
+            query = (search_field.value or "").strip()
+            if not query:
+                search_results.visible = False
+                employee_rows.visible = True
+                return
+            search_results.controls = [build_employee_row(employee) for employee in name_index.search(query)]
+            search_results.visible = True
+            employee_rows.visible = False
+            if fetch:
+                load_more(all_pages=True)
+
+        def on_search_change(e):
+            apply_search()
+            page.update()
 
-            if insert_location_2:
-                try:
-                    response = requests.head(insert_location_2, allow_redirects=True)
+        search_field = ft.TextField(label="Buscar servidor", width=300, on_change=on_search_change)
 
-                    full_url = response.url
-        
-                    if "maps" in full_url:
-                        default_location_2 = full_url
-                        map_2.controls.remove(webview_2)  
-                        webview_2 = ft.WebView(default_location_2, width=600, height=800) 
-                        map_2.controls.append(webview_2)
-                        page.update()
-                        return default_location_2
-                    else:
-                        default_location_2 = "https://www.google.com/maps"
-                        return default_location_2
-            
-                except requests.RequestException as e:
-                    print(f"Error expanding URL: {e}")
-                    default_location_2 = "https://www.google.com/maps"
-                    return default_location_2
-                
-        page.update()
-    
-    def show_employee_list(driver_data):
-        page.controls.clear()
-        page.scroll = "auto"
-        
-        employee_list_controls = [
+        page.controls.append(
             ft.Row(
             controls=[ft.Container(content=logout_button, alignment=ft.alignment.top_left),
-                      ft.Container(content=ft.ElevatedButton("Início", on_click=lambda e: show_driver_dashboard(driver_data))),
+                      ft.Container(content=ft.ElevatedButton("Início", on_click=lambda e: show_driver_dashboard(store.state.user))),
                       ft.Container(content=ft.ElevatedButton("Atualizar"), on_click=lambda e: show_employee_list(driver_data))],
-            alignment=ft.MainAxisAlignment.START),
-            ft.Text("Servidores", size=24, weight="bold")
-            ]
-
-        try:
-            response = gov_employees_table.scan()
-            employees = response['Items']
-            for employee in employees:
-                button = ft.TextButton(
-                    f"{employee['Name']}",
-                    on_click=lambda e, emp_id=employee['ID']: show_employee_details(emp_id, driver_data)
-                )
-                employee_list_controls.append(button)
-        except ClientError as e:
-            print(f"Error fetching employees: {e}")
+            alignment=ft.MainAxisAlignment.START)
+        )
 
         employee_list = ft.Column(
-            controls=employee_list_controls,
+            controls=[ft.Text("Servidores", size=24, weight="bold"), search_field, employee_rows, search_results],
             alignment=ft.MainAxisAlignment.CENTER,
             horizontal_alignment=ft.CrossAxisAlignment.CENTER,
             spacing=20,
+            expand=True,
         )
         page.controls.append(employee_list)
         page.update()
+        load_more()
 
-    def show_employee_details(employee_id, driver_data):
-        employee = get_employee_data(employee_id)
-        page.controls.clear()
+    @traced_action
+    def show_employee_details(employee_id, driver_data, force_refresh=False):
+        local_employee = None if force_refresh else peek_item('GovernmentEmployees', employee_id)
+        if local_employee:
+            render_employee_details(employee_id, local_employee, driver_data)
+
+        def on_loaded(employee):
+            if employee != local_employee:
+                render_employee_details(employee_id, employee, driver_data)
+
+        run_io(lambda: get_employee_data(employee_id, force_refresh), on_loaded)
+
+    def render_employee_details(employee_id, employee, driver_data):
+        clear_view()
 
         page.controls.append(
             ft.Row(
                 controls=[ft.Container(content=logout_button, alignment=ft.alignment.top_left),
                           ft.Container(content=ft.ElevatedButton("Servidores", on_click=lambda e: show_employee_list(driver_data)), alignment=ft.alignment.top_left),
-                          ft.Container(content=ft.ElevatedButton("Atualizar", on_click=lambda e: show_employee_details(employee_id,driver_data)), alignment=ft.alignment.top_left)], 
+                          ft.Container(content=ft.ElevatedButton("Atualizar", on_click=lambda e: show_employee_details(employee_id,driver_data, force_refresh=True)), alignment=ft.alignment.top_left)], 
                 alignment=ft.MainAxisAlignment.START
             )
         )
 
-        location_link = employee.get("MapLocation", "https://www.google.com/maps")
+        location_link = employee.get("MapLocation", DEFAULT_MAP_URL)
         copy_location_button = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(location_link))
         contact = employee.get("Contato","Nenhuma Informação")
         copy_contact_button = ft.ElevatedButton("Copiar", on_click=lambda e: page.set_clipboard(contact))
 
-        webview = ft.WebView(location_link, width=600, height=500)
+        map_view.point(location_link, employee['Name'])
 
         details = ft.Column(
             controls=[
@@ -632,130 +2996,157 @@ def main(page: ft.Page):
                 ft.Text(f"Detalhamento: {employee['AdditionalDetails']}"),
                 ft.Text(f"Localização: {location_link}"),
                 copy_location_button,
-                webview
+                map_view.mount(height=500)
             ],
             alignment=ft.MainAxisAlignment.CENTER
         )
         page.controls.append(details)
         page.update()
 
+    @traced_action
     def share_location(user_data, location_link):
         
         if location_link:
-            try:
-                response = requests.head(location_link, allow_redirects=True)
-
-                full_url = response.url               
-            
-                if "Drivers" in user_data:
-                    update_driver_data(user_data["ID"], "SET MapLocation = :loc", {":loc": full_url})
-                    user_data["MapLocation"] = full_url
+            def share():
+                full_url = expand_url(location_link)
+                if full_url is None:
+                    return None
+                if store.state.table_name == 'Drivers':
+                    updated_item = update_driver_data(user_data["ID"], "SET MapLocation = :loc", {":loc": full_url})
+                    if updated_item:
+                        store.record_write('Drivers', updated_item)
                 else:
-                    update_employee_data(user_data["ID"], "SET MapLocation = :loc", {":loc": full_url})
-                    user_data["MapLocation"] = full_url
-
+                    updated_item = update_employee_data(user_data["ID"], "SET MapLocation = :loc", {":loc": full_url})
+                    if updated_item:
+                        store.record_write('GovernmentEmployees', updated_item)
+                return updated_item or dict(user_data, MapLocation=full_url)
+
+            def on_shared(updated_item):
+                if updated_item is None:
+                    return
+                store.set_user(updated_item)
                 page.overlay.append(ft.SnackBar(ft.Text("Location link shared successfully!")))
-                if "Drivers" in user_data:
-                    show_driver_dashboard(user_data)
+                if store.state.table_name == 'Drivers':
+                    show_driver_dashboard(store.state.user)
                 else:
-                    show_drivers_list(user_data)
+                    show_drivers_list(store.state.user)
 
-            except requests.RequestException as e:
-                print(f"Error expanding URL: {e}")
+            run_io(share, on_shared)
 
         else:
             page.overlay.append(ft.SnackBar(ft.Text("Please enter a valid location link.")))
 
+    @traced_action
     def share_driver_location(user_data, location_link):
         
         if location_link:
-            try:
-                response = requests.head(location_link, allow_redirects=True)
-
-                full_url = response.url               
-            
-                update_driver_data(user_data["ID"], "SET MapLocation = :loc", {":loc": full_url})
-                
-                user_data["MapLocation"] = full_url
-                
+            def share():
+                full_url = expand_url(location_link)
+                if full_url is None:
+                    return None
+                updated_item = update_driver_data(user_data["ID"], "SET MapLocation = :loc", {":loc": full_url})
+                if updated_item:
+                    store.record_write('Drivers', updated_item)
+                return updated_item or dict(user_data, MapLocation=full_url)
+
+            def on_shared(updated_item):
+                if updated_item is None:
+                    return
+                store.set_user(updated_item)
                 page.overlay.append(ft.SnackBar(ft.Text("Location link shared successfully!")))
-                
-                show_driver_dashboard(user_data)
-          
-            except requests.RequestException as e:
-                print(f"Error expanding URL: {e}")
-
-
-    def accept_ride_request(driver_data, employee_name):
-        if employee_name in driver_data.get("RideRequests", []):
-            update_driver_data(driver_data["ID"], "DELETE RideRequests :r ADD Passengers :p", {
-                ":r": {employee_name}, 
-                ":p": {employee_name}
-            })
-            ensure_set_attribute_exists('Drivers', driver_data["ID"], "Passengers")
-            driver_data["RideRequests"].remove(employee_name)
-            if "Passengers" not in driver_data:
-                driver_data["Passengers"] = []
-            driver_data["Passengers"].append(employee_name)
-            page.overlay.append(ft.SnackBar(ft.Text(f"Ride request from {employee_name} accepted!")))
-            show_driver_dashboard(driver_data)
-
-    def deny_ride_request(driver_data, employee_name):
-        if employee_name in driver_data.get("RideRequests", []):
-            update_driver_data(driver_data["ID"], "DELETE RideRequests :r", {":r": {employee_name}})
-            ensure_set_attribute_exists('Drivers', driver_data["ID"], "RideRequests")
-            driver_data["RideRequests"].remove(employee_name)
-            page.overlay.append(ft.SnackBar(ft.Text(f"Ride request from {employee_name} denied!")))
-            show_driver_dashboard(driver_data)
+                show_driver_dashboard(store.state.user)
+
+            run_io(share, on_shared)
+
+    def show_ride_result(result, done_message, conflict_message):
+        """Tells the user how a ride transition went; conflicts come with the current driver item to show instead."""
+        if result.outcome in (RideOutcome.DONE, RideOutcome.QUEUED):
+            message = done_message
+        elif result.outcome == RideOutcome.FULL:
+            message = "Não há mais vagas neste veículo."
+        elif result.outcome == RideOutcome.CONFLICT:
+            message = conflict_message
+        else:
+            message = "Não foi possível atualizar a corrida. Tente novamente."
+        page.overlay.append(ft.SnackBar(ft.Text(message)))
 
+    @traced_action
+    def accept_ride_request(driver_data, ride):
+        employee_name = ride['EmployeeName']
+
+        def on_accepted(result):
+            show_ride_result(result, f"Ride request from {employee_name} accepted!", f"{employee_name} cancelou a solicitação.")
+            show_driver_dashboard(result.driver or driver_data, result.rides)
+            store.set_user(result.driver)
+
+        run_io(lambda: transition_ride('accept', driver_data["ID"], ride['EmployeeID'], employee_name), on_accepted)
+
+    @traced_action
+    def deny_ride_request(driver_data, ride):
+        employee_name = ride['EmployeeName']
+
+        def on_denied(result):
+            show_ride_result(result, f"Ride request from {employee_name} denied!", f"{employee_name} cancelou a solicitação.")
+            show_driver_dashboard(result.driver or driver_data, result.rides)
+            store.set_user(result.driver)
+
+        run_io(lambda: transition_ride('deny', driver_data["ID"], ride['EmployeeID']), on_denied)
+
+    @traced_action
     def refresh_driver_dashboard(driver_data):
-        updated_data = get_driver_data(driver_data["ID"])
-        if updated_data:
-            show_driver_dashboard(updated_data)
+        def on_refreshed(updated_data):
+            if updated_data:
+                show_driver_dashboard(updated_data)
+                store.set_user(updated_data)
 
+        run_io(lambda: get_driver_data(driver_data["ID"], force_refresh=True), on_refreshed)
+
+    @traced_action
     def update_driver_status(driver_data, new_status):
-        update_expression = "SET #status = :s"
-        expression_attribute_names = {"#status": "Status"}
-        expression_attribute_values = {":s": new_status}
+        def on_updated(updated_data):
+            if updated_data:
+                store.record_write('Drivers', updated_data)
+                show_driver_dashboard(updated_data)
+                store.set_user(updated_data)
 
-        try:
-            drivers_table.update_item(
-                Key={'ID': driver_data["ID"]},
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expression_attribute_names,
-                ExpressionAttributeValues=expression_attribute_values
-            )
-            driver_data["Status"] = new_status
-            show_driver_dashboard(driver_data)
-        except ClientError as e:
-            print(f"Error updating driver status: {e}")
+        run_io(lambda: set_driver_status(driver_data["ID"], new_status), on_updated)
 
+    @traced_action
     def cancel_ride_request(employee_data):
-        try:
-            response = drivers_table.scan()
-            drivers = response['Items']
-            for driver in drivers:
-                if employee_data['Name'] in driver.get('RideRequests', []):
-                    update_driver_data(driver['ID'], "DELETE RideRequests :r", {":r": {employee_data['Name']}})
-                    ensure_set_attribute_exists('Drivers', driver['ID'], 'RideRequests')
-                    page.overlay.append(ft.SnackBar(ft.Text(f"Ride request canceled for driver {driver['Name']}")))
-                    break
-        except ClientError as e:
-            print(f"Error fetching drivers for cancellation: {e}")
-        show_drivers_list(employee_data)
-
-    def remove_passenger(driver_data, passenger):
-        update_driver_data(driver_data["ID"], "DELETE Passengers :p", {":p": {passenger}})
-        ensure_set_attribute_exists('Drivers', driver_data["ID"], "Passengers")
-        
-        if passenger in driver_data["Passengers"]:
-            driver_data["Passengers"].remove(passenger)
-        
-        page.overlay.append(ft.SnackBar(ft.Text(f"Passenger {passenger} removed.")))
-        show_driver_dashboard(driver_data)
+        def cancel():
+            for ride in get_employee_rides(employee_data['ID']):
+                if ride['State'] == 'RideRequests':
+                    result = transition_ride('cancel', ride['DriverID'], employee_data['ID'])
+                    # Ride items only carry the employee's name; the driver's comes from its item
+                    driver = result.driver or get_driver_data(ride['DriverID'])
+                    return result, driver['Name'] if driver else ""
+            return None, ""
+
+        def on_canceled(canceled):
+            result, driver_name = canceled
+            if result:
+                show_ride_result(result, f"Ride request canceled for driver {driver_name}",
+                                 f"{driver_name} já respondeu à solicitação.")
+            show_drivers_list(employee_data)
+
+        run_io(cancel, on_canceled)
+
+    @traced_action
+    def remove_passenger(driver_data, ride):
+        passenger = ride['EmployeeName']
+
+        def on_removed(result):
+            show_ride_result(result, f"Passenger {passenger} removed.", f"{passenger} não é mais passageiro.")
+            show_driver_dashboard(result.driver or driver_data, result.rides)
+            store.set_user(result.driver)
+
+        run_io(lambda: transition_ride('remove', driver_data["ID"], ride['EmployeeID']), on_removed)
 
     show_employee_login(None)
     page.update()
+    # Only now that the login form is on screen: AWS setup and the first sync overlap with the user typing
+    prewarm_dynamodb()
+    start_local_sync()
 
 if __name__ == "__main__":
     ft.app(target=main)